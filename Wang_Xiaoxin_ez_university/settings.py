@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 from django.urls import reverse_lazy
@@ -39,17 +40,20 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'courseInfo',
+    'courseInfo.apps.CourseinfoConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # outermost after security, so it compresses the final response
+    'courseInfo.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'courseInfo.middleware.WaitingRoomMiddleware',
 ]
 
 ROOT_URLCONF = 'Wang_Xiaoxin_ez_university.urls'
@@ -71,6 +75,26 @@ TEMPLATES = [
     },
 ]
 
+# COURSEINFO_TEMPLATE_ENGINE picks what renders the busiest pages:
+#   django  the Django templates in courseInfo/templates
+#   jinja2  the Jinja2 versions in courseInfo/jinja2 of the list and detail
+#           pages that render the most rows; every other page, the admin
+#           included, still uses the Django templates. Needs the Jinja2
+#           package; compare with "manage.py bench_templates".
+COURSEINFO_TEMPLATE_ENGINE = os.environ.get('COURSEINFO_TEMPLATE_ENGINE', 'django')
+
+if COURSEINFO_TEMPLATE_ENGINE == 'jinja2':
+    # looked up first, so a template it has wins over the Django one
+    TEMPLATES.insert(0, {
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'courseInfo.jinja2.environment',
+            'context_processors': TEMPLATES[0]['OPTIONS']['context_processors'],
+        },
+    })
+
 WSGI_APPLICATION = 'Wang_Xiaoxin_ez_university.wsgi.application'
 
 
@@ -124,6 +148,21 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+# collectstatic writes content-hashed names, the bundles below and .gz/.br
+# variants; the WSGI application serves them straight from STATIC_ROOT
+STATICFILES_STORAGE = 'courseInfo.storage.BundledManifestStaticFilesStorage'
+
+COURSEINFO_STATIC_BUNDLES = {
+    'courseInfo/site.css': [
+        'courseInfo/normalize.css',
+        'courseInfo/skeleton.css',
+        'courseInfo/style.css',
+    ],
+}
+
+# Cache lifetime, in seconds, for static files without a content hash
+COURSEINFO_STATIC_MAX_AGE = 60
+
 LOGIN_REDIRECT_URL = 'about_urlpattern'
 
 LOGOUT_REDIRECT_URL = 'login_urlpattern'
@@ -132,6 +171,160 @@ LOGIN_URL = reverse_lazy('login_urlpattern')
 
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
+
+# Caches
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+#
+# COURSEINFO_CACHE_BACKEND picks what backs the 'default' cache:
+#   locmem  per-process memory; fine for runserver and a single worker
+#   file    files under COURSEINFO_CACHE_DIR, shared by every worker process
+#           on the host; add() and incr() are not atomic across them
+#   redis   a Redis (or Redis protocol compatible) server at
+#           COURSEINFO_REDIS_URL; needs the django-redis package
+
+COURSEINFO_CACHE_BACKEND = os.environ.get('COURSEINFO_CACHE_BACKEND', 'locmem')
+
+COURSEINFO_CACHE_DIR = os.environ.get(
+    'COURSEINFO_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'ez_university'))
+
+COURSEINFO_REDIS_URL = os.environ.get('COURSEINFO_REDIS_URL', 'redis://127.0.0.1:6379/1')
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'courseInfo-default',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(COURSEINFO_CACHE_DIR, 'default'),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': COURSEINFO_REDIS_URL,
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[COURSEINFO_CACHE_BACKEND],
+    # never per-process, so every worker process sees the same sessions
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(COURSEINFO_CACHE_DIR, 'sessions'),
+        'TIMEOUT': 60 * 60 * 24 * 14,
+        # the default of 300 entries would evict logged-in users during peaks
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+if COURSEINFO_CACHE_BACKEND == 'redis':
+    CACHES['sessions'] = dict(
+        CACHE_BACKENDS['redis'], KEY_PREFIX='sessions', TIMEOUT=60 * 60 * 24 * 14)
+
+# Alias used by courseInfo.cache for versioned, model-invalidated entries
+COURSEINFO_CACHE_ALIAS = 'default'
+
+# With locmem a worker never sees another worker's changes move a model
+# version, so courseInfo.cache entries otherwise kept until the version
+# changes (the registration window table, the prerequisite closure) are
+# rebuilt after this many seconds instead
+COURSEINFO_LOCAL_CACHE_TIMEOUT = 10
+
+# How long, in seconds, a create form's idempotency key remembers the object
+# it created; a replayed POST within that time is redirected to the same
+# object instead of creating another. Keys live in the 'default' cache, so
+# replays are only recognised across workers with the file or redis backend,
+# and only redis turns away a replay that races the first POST in another
+# worker: the file backend's add() is not atomic across processes.
+COURSEINFO_IDEMPOTENCY_TIMEOUT = 60 * 60
+
+# Most credit hours a student may register for in one semester; None for
+# no limit
+COURSEINFO_MAX_CREDIT_HOURS = 18
+
+# Year, Period and Semester rows are kept in each process (courseInfo.refdata).
+# With the file or redis backend they are reloaded when their version in the
+# 'default' cache changes, checked at most this often; with locmem, whose
+# versions other workers cannot see, they are reloaded this often. Either
+# way a change shows in every worker within this many seconds.
+COURSEINFO_REFDATA_CHECK_INTERVAL = 1.0
+
+# Waiting room in front of the registration pages: at most
+# COURSEINFO_WAITING_ROOM_SLOTS visitors register at once (0 turns it off),
+# the rest wait in line on a page that reloads every
+# COURSEINFO_WAITING_ROOM_REFRESH seconds. An admitted visitor keeps their
+# slot until a POST to one of COURSEINFO_WAITING_ROOM_DONE_URLS succeeds, or
+# until COURSEINFO_WAITING_ROOM_LEASE seconds after their last request if
+# they leave without registering.
+# The line is kept in the 'default' cache and needs its add() and incr() to
+# be atomic. With redis every worker shares one line; with locmem each worker
+# process runs its own line of COURSEINFO_WAITING_ROOM_SLOTS. The file
+# backend does neither atomically, so the waiting room refuses to start on it.
+COURSEINFO_WAITING_ROOM_SLOTS = int(os.environ.get('COURSEINFO_WAITING_ROOM_SLOTS', 50))
+
+COURSEINFO_WAITING_ROOM_REFRESH = 5
+
+COURSEINFO_WAITING_ROOM_LEASE = 300
+
+COURSEINFO_WAITING_ROOM_URLS = [
+    'courseInfo_registration_create_urlpattern',
+    'courseInfo_registration_cart_urlpattern',
+    'courseInfo_registration_cart_add_urlpattern',
+    'courseInfo_registration_cart_remove_urlpattern',
+    'courseInfo_registration_cart_commit_urlpattern',
+]
+
+COURSEINFO_WAITING_ROOM_DONE_URLS = [
+    'courseInfo_registration_create_urlpattern',
+    'courseInfo_registration_cart_commit_urlpattern',
+]
+
+# Response compression (courseInfo.middleware.CompressionMiddleware): gzip
+# at COURSEINFO_COMPRESSION_LEVEL (1-9), or brotli at
+# COURSEINFO_COMPRESSION_BROTLI_QUALITY (0-11) when the brotli package is
+# installed and the client accepts it. Responses shorter than
+# COURSEINFO_COMPRESSION_MIN_LENGTH bytes are sent as they are; streamed
+# responses are flushed every COURSEINFO_COMPRESSION_FLUSH_SIZE bytes of
+# input, or at the first chunk COURSEINFO_COMPRESSION_FLUSH_INTERVAL seconds
+# after the last flush, and after every chunk for the content types in
+# COURSEINFO_COMPRESSION_FLUSH_TYPES. Measure with
+# "manage.py bench_compression".
+COURSEINFO_COMPRESSION_LEVEL = 6
+
+COURSEINFO_COMPRESSION_BROTLI_QUALITY = 5
+
+COURSEINFO_COMPRESSION_MIN_LENGTH = 500
+
+COURSEINFO_COMPRESSION_FLUSH_SIZE = 16 * 1024
+
+COURSEINFO_COMPRESSION_FLUSH_INTERVAL = 0.5
+
+COURSEINFO_COMPRESSION_FLUSH_TYPES = ['application/x-ndjson']
+
+
+# Sessions
+# https://docs.djangoproject.com/en/2.2/topics/http/sessions/
+#
+# COURSEINFO_SESSION_MODE picks the session backend:
+#   db              every request reads django_session (Django's default)
+#   cached_db       reads come from the 'sessions' cache, writes go through
+#                   to django_session so nothing is lost on a cache flush
+#   cache           sessions live only in the 'sessions' cache
+#   signed_cookies  no server side storage at all
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+COURSEINFO_SESSION_MODE = os.environ.get('COURSEINFO_SESSION_MODE', 'cached_db')
+
+SESSION_ENGINE = SESSION_ENGINES[COURSEINFO_SESSION_MODE]
+
+SESSION_CACHE_ALIAS = 'sessions'
+
 # STATIC_URL = '/static/'
 # STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 #
@@ -11,6 +11,8 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from courseInfo.staticserve import StaticFilesApplication
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Wang_Xiaoxin_ez_university.settings')
 
-application = get_wsgi_application()
+application = StaticFilesApplication(get_wsgi_application())
@@ -1,11 +1,78 @@
 from django.contrib import admin
-from .models import Semester, Section, Course, Instructor, Student, Registration, Period, Year
+from django.contrib.admin import helpers
+from django.shortcuts import render
+
+from .forms import SemesterRolloverForm
+from .models import Semester, Section, Course, Instructor, Student, Registration, Period, Year, \
+    RegistrationWindow, Prerequisite, StudentSemesterLoad, Room, StudentGradeSummary, SectionGradeCount
+from .rollover import roll_over
+
+
+def roll_over_sections(modeladmin, request, queryset):
+    if 'apply' in request.POST:
+        form = SemesterRolloverForm(request.POST)
+        if form.is_valid():
+            target = form.cleaned_data['target']
+            dry_run = form.cleaned_data['dry_run']
+            copied, skipped = roll_over(
+                list(queryset.values_list('pk', flat=True)), target.pk, dry_run=dry_run)
+            modeladmin.message_user(request, '%s %d sections into %s, skipped %d already there.' % (
+                'Would copy' if dry_run else 'Copied', copied, target, skipped))
+            return None
+    else:
+        form = SemesterRolloverForm()
+    return render(request, 'admin/courseInfo/semester/roll_over_sections.html', dict(
+        modeladmin.admin_site.each_context(request),
+        title='Copy sections into another semester',
+        opts=modeladmin.model._meta,
+        form=form,
+        semesters=queryset,
+        action_checkbox_name=helpers.ACTION_CHECKBOX_NAME,
+    ))
+
+
+roll_over_sections.short_description = 'Copy sections into another semester'
+# the action creates sections, whatever the semester permissions
+roll_over_sections.allowed_permissions = ('add_section',)
+
+
+class SemesterAdmin(admin.ModelAdmin):
+    actions = [roll_over_sections]
+
+    def has_add_section_permission(self, request):
+        return request.user.has_perm('courseInfo.add_section')
+
+
+class MaintainedTotalAdmin(admin.ModelAdmin):
+    """
+    Totals the signal handlers keep in step with registrations; an edit
+    here would put them out of step, so they can be looked at only.
+    """
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 admin.site.register(Year)
 admin.site.register(Period)
-admin.site.register(Semester)
+admin.site.register(Semester, SemesterAdmin)
+admin.site.register(Room)
 admin.site.register(Section)
 admin.site.register(Course)
+admin.site.register(Prerequisite)
 admin.site.register(Instructor)
 admin.site.register(Student)
 admin.site.register(Registration)
+admin.site.register(RegistrationWindow)
+admin.site.register(StudentSemesterLoad, MaintainedTotalAdmin)
+admin.site.register(StudentGradeSummary, MaintainedTotalAdmin)
+admin.site.register(SectionGradeCount, MaintainedTotalAdmin)
@@ -0,0 +1,534 @@
+"""
+Read-only JSON API for the courseInfo catalogue.
+
+Rows are read with values_list() and written out as they come back from
+the database: no model instances are built and no __str__() walks foreign
+keys. Related labels (a semester's year, a section's course number) are
+plain fields resolved by a join in the same query.
+
+    GET /api/v1/section/?fields=section_id,course_number&limit=500
+    GET /api/v1/section/?cursor=<next from the previous page>
+    GET /api/v1/section/42/
+
+POST /api/v1/batch/ answers several resource requests in one round trip
+and expands foreign keys through a request-scoped DataLoader, so the
+same section, course or instructor is read at most once per batch and
+every model is read with one query per level of expansion:
+
+    {"requests": [
+        {"key": "student", "resource": "student", "ids": [5]},
+        {"key": "registrations", "resource": "registration",
+         "filter": {"student_id": 5},
+         "expand": ["section.course", "section.instructor", "section.semester"]}
+    ]}
+
+GET /api/v1/schedules/?semester=3&course=12&course=15 streams every
+clash-free combination of those courses' sections as JSON lines.
+"""
+import json
+from collections import Counter
+
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views import View
+
+from .enrollment import bulk_enroll
+from .loader import DataLoader
+from .models import (
+    Course, Instructor, Period, Registration, Section, Semester, Student, Year)
+from .schedules import ScheduleSearch, time_groups
+
+API_VERSION = 'v1'
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MAX_BATCH_REQUESTS = 20
+MAX_BULK_PAIRS = 10000
+MAX_SCHEDULE_COURSES = 10
+MAX_SCHEDULE_NODES = 200000
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class Resource:
+    """
+    A model exposed through the API. fields maps each public field name to
+    the lookup handed to values_list(); defaults are the fields returned
+    when the client doesn't ask for any.
+    """
+
+    def __init__(self, model, fields, defaults=None):
+        self.model = model
+        self.fields = dict(fields)
+        self.defaults = list(defaults or [name for name, _ in fields])
+
+    @property
+    def name(self):
+        return self.model._meta.model_name
+
+    @property
+    def permission(self):
+        return 'courseInfo.view_%s' % self.name
+
+    def field_names(self, requested):
+        if not requested:
+            return self.defaults
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError('Unknown field(s) for %s: %s. Available: %s.' % (
+                self.name, ', '.join(unknown), ', '.join(self.fields)))
+        return names
+
+    def rows(self, queryset, names):
+        return queryset.values_list(*[self.fields[name] for name in names])
+
+    def model_field(self, name):
+        """The model field at the end of name's lookup, e.g. Year.year for 'year__year'."""
+        model = self.model
+        for part in self.fields[name].split('__'):
+            field = model._meta.get_field(part)
+            model = field.related_model
+        return field
+
+    @property
+    def relations(self):
+        """Foreign key name -> (id field, target resource name)."""
+        return {
+            field.name: (field.attname, field.related_model._meta.model_name)
+            for field in self.model._meta.fields
+            if field.many_to_one and field.attname in self.fields
+        }
+
+
+RESOURCES = {resource.name: resource for resource in [
+    Resource(Year, [('year_id', 'year_id'), ('year', 'year')]),
+    Resource(Period, [
+        ('period_id', 'period_id'),
+        ('period_sequence', 'period_sequence'),
+        ('period_name', 'period_name'),
+    ]),
+    Resource(Semester, [
+        ('semester_id', 'semester_id'),
+        ('year_id', 'year_id'),
+        ('period_id', 'period_id'),
+        ('year', 'year__year'),
+        ('period_name', 'period__period_name'),
+    ], defaults=['semester_id', 'year_id', 'period_id']),
+    Resource(Course, [
+        ('course_id', 'course_id'),
+        ('course_number', 'course_number'),
+        ('course_name', 'course_name'),
+        ('credit_hours', 'credit_hours'),
+    ]),
+    Resource(Instructor, [
+        ('instructor_id', 'instructor_id'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+    ]),
+    Resource(Section, [
+        ('section_id', 'section_id'),
+        ('section_name', 'section_name'),
+        ('semester_id', 'semester_id'),
+        ('course_id', 'course_id'),
+        ('instructor_id', 'instructor_id'),
+        ('course_number', 'course__course_number'),
+        ('course_name', 'course__course_name'),
+    ], defaults=['section_id', 'section_name', 'semester_id', 'course_id', 'instructor_id']),
+    Resource(Student, [
+        ('student_id', 'student_id'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('nickname', 'nickname'),
+        ('cohort', 'cohort'),
+    ]),
+    Resource(Registration, [
+        ('registration_id', 'registration_id'),
+        ('student_id', 'student_id'),
+        ('section_id', 'section_id'),
+        ('grade', 'grade'),
+    ]),
+]}
+
+
+def serialize(names, rows, shape='objects'):
+    # 'rows' keeps the column order of 'fields' and skips building dicts
+    if shape == 'rows':
+        return list(rows)
+    return [dict(zip(names, row)) for row in rows]
+
+
+def json_response(payload, status=200):
+    return HttpResponse(
+        json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')),
+        content_type='application/json', status=status)
+
+
+def read_json(request):
+    try:
+        return json.loads(request.body.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        raise ApiError('The request body must be JSON.')
+
+
+def is_list_of(value, kind):
+    return isinstance(value, list) and all(isinstance(item, kind) for item in value)
+
+
+def parse_int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ApiError('%s must be an integer.' % name)
+
+
+class ApiView(View):
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return json_response({'error': str(error)}, status=error.status)
+
+
+class ApiResourceView(LoginRequiredMixin, PermissionRequiredMixin, ApiView):
+    raise_exception = True
+
+    def get_resource(self):
+        try:
+            return RESOURCES[self.kwargs['resource']]
+        except KeyError:
+            raise Http404('No API resource named %r.' % self.kwargs['resource'])
+
+    def get_permission_required(self):
+        return [self.get_resource().permission]
+
+
+class ApiResourceList(ApiResourceView):
+    def get(self, request, resource):
+        resource = self.get_resource()
+        names = resource.field_names(request.GET.get('fields'))
+        shape = request.GET.get('shape', 'objects')
+        if shape not in ('objects', 'rows'):
+            raise ApiError("shape must be 'objects' or 'rows'.")
+        limit = parse_int(request.GET.get('limit', DEFAULT_LIMIT), 'limit')
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ApiError('limit must be between 1 and %d.' % MAX_LIMIT)
+        queryset = resource.model.objects.order_by('pk')
+        cursor = request.GET.get('cursor')
+        if cursor:
+            queryset = queryset.filter(pk__gt=parse_int(cursor, 'cursor'))
+
+        lookups = [resource.fields[name] for name in names]
+        pk_name = resource.model._meta.pk.name
+        if pk_name in names:
+            pk_index = names.index(pk_name)
+        else:
+            # the primary key rides along as an extra column for the cursor
+            lookups.append('pk')
+            pk_index = -1
+        rows = list(queryset.values_list(*lookups)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = str(rows[-1][pk_index]) if has_more else None
+        if pk_index == -1:
+            rows = [row[:-1] for row in rows]
+        payload = {
+            'version': API_VERSION,
+            'resource': resource.name,
+            'fields': names,
+            'results': serialize(names, rows, shape),
+            'next': next_cursor,
+        }
+        return json_response(payload)
+
+
+class ApiResourceDetail(ApiResourceView):
+    def get(self, request, resource, pk):
+        resource = self.get_resource()
+        names = resource.field_names(request.GET.get('fields'))
+        row = resource.rows(resource.model.objects.filter(pk=pk), names).first()
+        if row is None:
+            raise Http404('No %s with id %s.' % (resource.name, pk))
+        return json_response({
+            'version': API_VERSION,
+            'resource': resource.name,
+            'result': dict(zip(names, row)),
+        })
+
+
+class BatchRequest:
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise ApiError('Each request must be an object.')
+        self.key = spec.get('key')
+        if not isinstance(self.key, str) or not self.key:
+            raise ApiError('Each request needs a string "key".')
+        try:
+            self.resource = RESOURCES[spec.get('resource')]
+        except (KeyError, TypeError):
+            raise ApiError('%s: unknown resource %r.' % (self.key, spec.get('resource')))
+        fields = spec.get('fields')
+        if fields is not None and not is_list_of(fields, str):
+            raise ApiError('%s: "fields" must be a list of strings.' % self.key)
+        self.names = self.resource.field_names(','.join(fields) if fields else None)
+        self.ids = spec.get('ids')
+        self.filter = spec.get('filter')
+        if (self.ids is None) == (self.filter is None):
+            raise ApiError('%s: give exactly one of "ids" and "filter".' % self.key)
+        if self.ids is not None:
+            if not isinstance(self.ids, list):
+                raise ApiError('%s: "ids" must be a list.' % self.key)
+            self.ids = [parse_int(pk, 'ids') for pk in self.ids]
+            if len(self.ids) > MAX_LIMIT:
+                raise ApiError('%s: at most %d ids.' % (self.key, MAX_LIMIT))
+        else:
+            self.filter = self.parse_filter(self.filter)
+        self.limit = parse_int(spec.get('limit', DEFAULT_LIMIT), 'limit')
+        if not 1 <= self.limit <= MAX_LIMIT:
+            raise ApiError('limit must be between 1 and %d.' % MAX_LIMIT)
+        expand = spec.get('expand') or []
+        if not is_list_of(expand, str):
+            raise ApiError('%s: "expand" must be a list of strings.' % self.key)
+        self.paths = self.parse_expand(expand)
+
+    def parse_filter(self, conditions):
+        if not isinstance(conditions, dict):
+            raise ApiError('%s: "filter" must be an object.' % self.key)
+        lookups = {}
+        for name, value in conditions.items():
+            if name not in self.resource.fields:
+                raise ApiError('%s: cannot filter on %r.' % (self.key, name))
+            lookup = self.resource.fields[name]
+            if isinstance(value, list):
+                lookups[lookup + '__in'] = [self.filter_value(name, item) for item in value]
+            else:
+                lookups[lookup] = self.filter_value(name, value)
+        return lookups
+
+    def filter_value(self, name, value):
+        # converted here, so a value the column can't hold is the client's
+        # 400 rather than an error from the query
+        if value is not None and not isinstance(value, (str, int, float)):
+            raise ApiError('%s: %r must be compared with a string or number.' % (
+                self.key, name))
+        try:
+            return self.resource.model_field(name).to_python(value)
+        except (ValueError, TypeError, ValidationError):
+            raise ApiError('%s: %r is not a valid value for %r.' % (self.key, value, name))
+
+    def parse_expand(self, expand):
+        """
+        Validate dotted foreign key paths; return every path, parents
+        included, as a tuple of (relation name, id field, target resource)
+        steps.
+        """
+        paths = set()
+        for dotted in expand:
+            resource = self.resource
+            steps = []
+            for name in dotted.split('.'):
+                if name not in resource.relations:
+                    raise ApiError('%s: %s has no relation %r to expand.' % (
+                        self.key, resource.name, name))
+                attname, target = resource.relations[name]
+                available = self.names if not steps else resource.defaults
+                if attname not in available:
+                    raise ApiError('%s: expanding %r needs the %r field.' % (
+                        self.key, dotted, attname))
+                steps.append((name, attname, target))
+                paths.add(tuple(steps))
+                resource = RESOURCES[target]
+        return sorted(paths, key=len)
+
+    def resource_names(self):
+        names = {self.resource.name}
+        for path in self.paths:
+            names.update(target for _, _, target in path)
+        return names
+
+
+def objects_at(rows, steps):
+    objects = rows
+    for name, _, _ in steps:
+        objects = [obj[name] for obj in objects if obj.get(name) is not None]
+    return objects
+
+
+class ApiBatch(LoginRequiredMixin, ApiView):
+    raise_exception = True
+    http_method_names = ['post']
+
+    def post(self, request):
+        body = read_json(request)
+        specs = body.get('requests') if isinstance(body, dict) else None
+        if not isinstance(specs, list) or not specs:
+            raise ApiError('"requests" must be a non-empty list.')
+        if len(specs) > MAX_BATCH_REQUESTS:
+            raise ApiError('At most %d requests per batch.' % MAX_BATCH_REQUESTS)
+        batch = [BatchRequest(spec) for spec in specs]
+        if len({item.key for item in batch}) != len(batch):
+            raise ApiError('Request keys must be unique.')
+
+        permissions = {RESOURCES[name].permission
+                       for item in batch for name in item.resource_names()}
+        if not request.user.has_perms(sorted(permissions)):
+            raise ApiError('Permission denied.', status=403)
+
+        loader = DataLoader(RESOURCES)
+        results = self.load_requests(batch, loader)
+        self.expand(batch, results, loader)
+        return json_response({
+            'version': API_VERSION,
+            'results': results,
+            'queries': loader.queries,
+        })
+
+    def load_requests(self, batch, loader):
+        results = {}
+        for item in batch:
+            if item.ids is not None:
+                loader.want(item.resource.name, item.ids)
+                continue
+            queryset = item.resource.model.objects.filter(**item.filter).order_by('pk')
+            rows = [dict(zip(item.names, row))
+                    for row in item.resource.rows(queryset, item.names)[:item.limit]]
+            loader.queries += 1
+            if item.names == item.resource.defaults:
+                # copies: expand() adds nested objects to the result rows,
+                # and those must not show up in rows other requests load
+                loader.prime(item.resource.name, [dict(row) for row in rows])
+            results[item.key] = rows
+        loader.dispatch()
+        for item in batch:
+            if item.ids is not None:
+                rows = loader.get_many(item.resource.name, item.ids)
+                results[item.key] = [
+                    {name: row[name] for name in item.names} for row in rows]
+        return {item.key: results[item.key] for item in batch}
+
+    def expand(self, batch, results, loader):
+        # one level at a time, so each model is read once per level for the
+        # whole batch rather than once per request or per row
+        depth = max([len(path) for item in batch for path in item.paths] or [0])
+        for level in range(1, depth + 1):
+            work = []
+            for item in batch:
+                for path in item.paths:
+                    if len(path) != level:
+                        continue
+                    name, attname, target = path[-1]
+                    parents = objects_at(results[item.key], path[:-1])
+                    loader.want(target, [parent.get(attname) for parent in parents])
+                    work.append((parents, name, attname, target))
+            loader.dispatch()
+            for parents, name, attname, target in work:
+                for parent in parents:
+                    row = loader.get(target, parent.get(attname))
+                    # a new dict per parent, so deeper expansions never leak
+                    # between rows or back into the loader
+                    parent[name] = dict(row) if row is not None else None
+
+
+def parse_pair(item):
+    if isinstance(item, dict):
+        item = (item.get('student_id'), item.get('section_id'))
+    if not isinstance(item, (list, tuple)) or len(item) != 2:
+        raise ApiError('Each pair must be [student_id, section_id] or an object '
+                       'with student_id and section_id.')
+    return parse_int(item[0], 'student_id'), parse_int(item[1], 'section_id')
+
+
+class ApiBulkRegistration(LoginRequiredMixin, PermissionRequiredMixin, ApiView):
+    """
+    POST {"pairs": [[student_id, section_id], ...], "dry_run": false}
+
+    Enrolls every valid pair in one transaction and reports what happened
+    to each pair, in the order given.
+    """
+    raise_exception = True
+    permission_required = 'courseInfo.add_registration'
+    http_method_names = ['post']
+
+    def post(self, request):
+        body = read_json(request)
+        pairs = body.get('pairs') if isinstance(body, dict) else None
+        if not isinstance(pairs, list) or not pairs:
+            raise ApiError('"pairs" must be a non-empty list.')
+        if len(pairs) > MAX_BULK_PAIRS:
+            raise ApiError('At most %d pairs per request.' % MAX_BULK_PAIRS)
+        results = bulk_enroll([parse_pair(item) for item in pairs],
+                              dry_run=bool(body.get('dry_run')))
+        return json_response({
+            'version': API_VERSION,
+            'summary': Counter(result['status'] for result in results),
+            'results': results,
+        })
+
+
+class ApiSchedules(LoginRequiredMixin, PermissionRequiredMixin, ApiView):
+    """
+    GET ?semester=<id>&course=<id>&course=<id>[&limit=100]
+
+    Streams JSON lines: first the sections involved, then one line per
+    clash-free schedule as it is found, then a summary saying whether the
+    search was cut short by the limit or by MAX_SCHEDULE_NODES.
+    """
+    raise_exception = True
+    permission_required = 'courseInfo.view_section'
+
+    def get(self, request):
+        semester_id = parse_int(request.GET.get('semester'), 'semester')
+        course_ids = []
+        for value in request.GET.getlist('course'):
+            for part in value.split(','):
+                course_id = parse_int(part, 'course')
+                if course_id not in course_ids:
+                    course_ids.append(course_id)
+        if not course_ids:
+            raise ApiError('Give at least one course.')
+        if len(course_ids) > MAX_SCHEDULE_COURSES:
+            raise ApiError('At most %d courses per request.' % MAX_SCHEDULE_COURSES)
+        limit = parse_int(request.GET.get('limit', DEFAULT_LIMIT), 'limit')
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ApiError('limit must be between 1 and %d.' % MAX_LIMIT)
+
+        names = ['section_id', 'course_id', 'section_name', 'meeting_days',
+                 'start_time', 'end_time']
+        rows = list(Section.objects
+                    .filter(semester_id=semester_id, course_id__in=course_ids)
+                    .order_by('section_name', 'pk')
+                    .values_list(*names))
+        by_course = {course_id: [] for course_id in course_ids}
+        for row in rows:
+            by_course[row[1]].append((row[0],) + row[3:])
+        empty = [course_id for course_id, sections in by_course.items() if not sections]
+        if empty:
+            raise ApiError('No sections in semester %d for course %s.'
+                           % (semester_id, ', '.join(str(course_id) for course_id in empty)))
+        search = ScheduleSearch([time_groups(by_course[course_id]) for course_id in course_ids],
+                                MAX_SCHEDULE_NODES)
+        return StreamingHttpResponse(
+            self.lines(names, rows, course_ids, search, limit),
+            content_type='application/x-ndjson')
+
+    def lines(self, names, rows, course_ids, search, limit):
+        def line(payload):
+            return json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+
+        yield line({'version': API_VERSION, 'course_ids': course_ids,
+                    'sections': serialize(names, rows)})
+        found = 0
+        for schedule in search:
+            found += 1
+            yield line({'schedule': [{'course_id': course_id, 'section_ids': section_ids}
+                                     for course_id, section_ids in zip(course_ids, schedule)]})
+            if found == limit:
+                break
+        yield line({'schedules': found,
+                    'complete': found < limit and not search.truncated,
+                    'nodes': search.nodes})
@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class CourseinfoConfig(AppConfig):
     name = 'courseInfo'
+
+    def ready(self):
+        from courseInfo import cache, credits, grades, prerequisites, presave, refdata
+        cache.connect_signals(self)
+        presave.connect_signals()
+        prerequisites.connect_signals()
+        credits.connect_signals()
+        grades.connect_signals()
+        refdata.connect_signals()
@@ -0,0 +1,151 @@
+"""
+Versioned cache entries for courseInfo.
+
+Every model has a version number kept in the cache. Keys built with
+make_key() embed the current version of each model they depend on, so
+bumping a version (which the signal handlers below do on every save or
+delete) makes all entries derived from that model unreachable at once,
+in every worker process that shares the cache.
+
+    sections = cache.get_or_set(
+        [Section, Course], ('semester', semester.pk),
+        lambda: list(semester.sections.values('pk', 'course__course_number')))
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+KEY_PREFIX = 'courseInfo'
+
+
+def get_cache():
+    return caches[getattr(settings, 'COURSEINFO_CACHE_ALIAS', 'default')]
+
+
+def is_shared():
+    """
+    Whether the cache is one store for every worker process. Under locmem
+    (or dummy) a version bump is only seen by the process that made it.
+    """
+    return not isinstance(get_cache(), (LocMemCache, DummyCache))
+
+
+def is_atomic():
+    """
+    Whether add() and incr() are atomic for every process using the cache.
+    The file and database backends read the entry and then write it, so
+    two workers can both win the same add() or get the same incr().
+    """
+    return not isinstance(get_cache(), (FileBasedCache, DatabaseCache))
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def _version_key(model):
+    return '%s:version:%s' % (KEY_PREFIX, _label(model))
+
+
+def _as_list(models):
+    if isinstance(models, (list, tuple)):
+        return list(models)
+    return [models]
+
+
+def _new_version():
+    # the time plus random bits, so two changes within one millisecond
+    # still (but for a 1 in 65536 chance) get different versions, and a
+    # version evicted from the cache never comes back as one some stale
+    # entry was stored under
+    return '%x%04x' % (int(time.time() * 1000), random.getrandbits(16))
+
+
+def get_versions(models):
+    models = _as_list(models)
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            # add() so two processes racing here agree on the first version
+            cache.add(key, _new_version(), None)
+            found[key] = cache.get(key)
+        versions.append(found[key])
+    return versions
+
+
+def make_key(models, *parts):
+    models = _as_list(models)
+    versions = get_versions(models)
+    stamp = ','.join(
+        '%s.%s' % (_label(model), version)
+        for model, version in zip(models, versions))
+    return ':'.join([KEY_PREFIX, stamp] + [str(part) for part in parts])
+
+
+def _timeout(timeout):
+    # other workers never see a version change in a per-process cache, so
+    # there "until the version changes" can only mean "for a while"
+    if timeout is None and not is_shared():
+        return getattr(settings, 'COURSEINFO_LOCAL_CACHE_TIMEOUT', 10)
+    return timeout
+
+
+def get(models, parts, default=None):
+    return get_cache().get(make_key(models, *parts), default)
+
+
+def put(models, parts, value, timeout=None):
+    get_cache().set(make_key(models, *parts), value, _timeout(timeout))
+
+
+def get_or_set(models, parts, default, timeout=None):
+    """
+    Return the cached value for parts, computing and storing default() on
+    a miss. timeout=None keeps the entry until a model version changes, or
+    with locmem for COURSEINFO_LOCAL_CACHE_TIMEOUT seconds.
+    """
+    key = make_key(models, *parts)
+    cache = get_cache()
+    value = cache.get(key)
+    if value is None:
+        value = default()
+        cache.set(key, value, _timeout(timeout))
+    return value
+
+
+def invalidate(model):
+    # a plain set rather than incr(): incr() is a get-then-set on some
+    # backends (the file cache among them) and stores the key with the
+    # default timeout, while a fresh version needs neither
+    get_cache().set(_version_key(model), _new_version(), None)
+
+
+def _invalidate_sender(sender, **kwargs):
+    invalidate(sender)
+
+
+def _invalidate_m2m(sender, instance, model, action, **kwargs):
+    if action.startswith('post_') and model._meta.app_label == KEY_PREFIX:
+        invalidate(type(instance))
+        invalidate(model)
+
+
+def connect_signals(app_config):
+    for model in app_config.get_models():
+        post_save.connect(
+            _invalidate_sender, sender=model,
+            dispatch_uid='courseInfo.cache.save.%s' % _label(model))
+        post_delete.connect(
+            _invalidate_sender, sender=model,
+            dispatch_uid='courseInfo.cache.delete.%s' % _label(model))
+    m2m_changed.connect(_invalidate_m2m, dispatch_uid='courseInfo.cache.m2m')
@@ -0,0 +1,77 @@
+"""
+A registration cart kept in the user's session.
+
+Staging a (student, section) pair only touches the session; nothing is
+validated against or written to the registration table until commit(),
+which enrolls every staged pair in one transaction through
+courseInfo.enrollment.bulk_enroll() or, if any pair fails, none of them.
+"""
+from .enrollment import CREATED, bulk_enroll
+from .models import Section, Student
+
+SESSION_KEY = 'courseInfo_registration_cart'
+
+
+class RegistrationCart:
+    def __init__(self, session):
+        self.session = session
+
+    def pairs(self):
+        return [tuple(pair) for pair in self.session.get(SESSION_KEY, [])]
+
+    def save(self, pairs):
+        self.session[SESSION_KEY] = [list(pair) for pair in pairs]
+
+    def __len__(self):
+        return len(self.session.get(SESSION_KEY, []))
+
+    def add(self, student_id, section_id):
+        pairs = self.pairs()
+        pair = (int(student_id), int(section_id))
+        if pair in pairs:
+            return False
+        pairs.append(pair)
+        self.save(pairs)
+        return True
+
+    def remove(self, student_id, section_id):
+        pairs = self.pairs()
+        pair = (int(student_id), int(section_id))
+        if pair not in pairs:
+            return False
+        pairs.remove(pair)
+        self.save(pairs)
+        return True
+
+    def clear(self):
+        self.session.pop(SESSION_KEY, None)
+
+    def items(self, results=None):
+        """
+        The staged pairs with their student and section, two queries in all.
+        results is bulk_enroll() output to attach a status to each pair.
+        """
+        pairs = self.pairs()
+        students = Student.objects.in_bulk({student_id for student_id, _ in pairs})
+        sections = (Section.objects
+                    .select_related('course')
+                    .in_bulk({section_id for _, section_id in pairs}))
+        statuses = {(result['student_id'], result['section_id']): result['status']
+                    for result in results or []}
+        return [{'student_id': student_id,
+                 'section_id': section_id,
+                 'student': students.get(student_id),
+                 'section': sections.get(section_id),
+                 'status': statuses.get((student_id, section_id))}
+                for student_id, section_id in pairs]
+
+    def commit(self):
+        """
+        Enroll everything in the cart or nothing. Returns (ok, results); the
+        cart is emptied only when every pair was enrolled.
+        """
+        results = bulk_enroll(self.pairs(), all_or_nothing=True)
+        ok = all(result['status'] == CREATED for result in results)
+        if ok:
+            self.clear()
+        return ok, results
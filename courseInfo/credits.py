@@ -0,0 +1,187 @@
+"""
+Credit hour totals per student and semester.
+
+StudentSemesterLoad holds the running total, so checking a registration
+against COURSEINFO_MAX_CREDIT_HOURS reads one row by its unique key
+instead of summing the student's registrations. The signal handlers
+below move the total with every registration saved or deleted, and with
+every section or course whose semester or credit hours change;
+courseInfo.enrollment.bulk_enroll(), whose bulk_create() sends no
+signals, calls adjust_many() itself.
+
+The forms check the limit before saving, which gives the friendly
+message, but two registrations for the same student can pass that check
+together. adjust() and adjust_many() therefore raise the limit again in
+the UPDATE that moves the total (... WHERE credit_hours <= limit - delta),
+so whichever registration comes second raises CreditLimitExceeded and
+is rolled back.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save
+
+from .models import Course, Registration, Section, StudentSemesterLoad
+from .presave import stored
+
+
+class CreditLimitExceeded(Exception):
+    """A registration would take a student past COURSEINFO_MAX_CREDIT_HOURS."""
+
+    def __init__(self, limit):
+        super().__init__(
+            'This registration would take the student past the limit of %d credit '
+            'hours in the semester.' % limit)
+        self.limit = limit
+
+
+def max_credit_hours():
+    return getattr(settings, 'COURSEINFO_MAX_CREDIT_HOURS', None)
+
+
+def current_load(student_id, semester_id):
+    return (StudentSemesterLoad.objects
+            .filter(student_id=student_id, semester_id=semester_id)
+            .values_list('credit_hours', flat=True)
+            .first()) or 0
+
+
+def _limited(loads, delta, limit):
+    # only increases are held to the limit; a total already over it (the
+    # limit was lowered) may still go down
+    if limit is None or delta <= 0:
+        return loads
+    return loads.filter(credit_hours__lte=limit - delta)
+
+
+def adjust(changes, limit=None):
+    """
+    Apply {(student_id, semester_id): credit hour delta} to the totals,
+    raising CreditLimitExceeded if an increase would pass limit.
+    """
+    for (student_id, semester_id), delta in changes.items():
+        if not delta:
+            continue
+        loads = StudentSemesterLoad.objects.filter(student_id=student_id, semester_id=semester_id)
+        if _limited(loads, delta, limit).update(credit_hours=F('credit_hours') + delta):
+            continue
+        if loads.exists():
+            raise CreditLimitExceeded(limit)
+        if limit is not None and delta > limit:
+            raise CreditLimitExceeded(limit)
+        try:
+            with transaction.atomic():
+                StudentSemesterLoad.objects.create(
+                    student_id=student_id, semester_id=semester_id, credit_hours=delta)
+        except IntegrityError:
+            # created by a concurrent registration since the update above
+            if not _limited(loads, delta, limit).update(credit_hours=F('credit_hours') + delta):
+                raise CreditLimitExceeded(limit)
+
+
+def adjust_many(changes, limit=None, chunk_size=900):
+    """
+    adjust() for a large batch: existing totals are moved with one UPDATE
+    per (semester, delta) group and missing ones are bulk inserted.
+    """
+    changes = {key: delta for key, delta in changes.items() if delta}
+    student_ids = sorted({student_id for student_id, _ in changes})
+    existing = set()
+    for start in range(0, len(student_ids), chunk_size):
+        existing.update(StudentSemesterLoad.objects
+                        .filter(student_id__in=student_ids[start:start + chunk_size])
+                        .order_by()
+                        .values_list('student_id', 'semester_id'))
+    groups = defaultdict(list)
+    new = []
+    for (student_id, semester_id), delta in changes.items():
+        if (student_id, semester_id) in existing:
+            groups[semester_id, delta].append(student_id)
+        elif limit is not None and delta > limit:
+            raise CreditLimitExceeded(limit)
+        else:
+            new.append(StudentSemesterLoad(
+                student_id=student_id, semester_id=semester_id, credit_hours=delta))
+    for (semester_id, delta), group in groups.items():
+        for start in range(0, len(group), chunk_size):
+            chunk = group[start:start + chunk_size]
+            loads = StudentSemesterLoad.objects.filter(
+                semester_id=semester_id, student_id__in=chunk)
+            if _limited(loads, delta, limit).update(
+                    credit_hours=F('credit_hours') + delta) < len(chunk):
+                raise CreditLimitExceeded(limit)
+    StudentSemesterLoad.objects.bulk_create(new, batch_size=500)
+
+
+def _section_load(section_id):
+    return Section.objects.filter(pk=section_id).values_list(
+        'semester_id', 'course__credit_hours').first()
+
+
+def _registration_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = stored(instance)
+    previous = before and (before['student_id'], before['section_id'])
+    current = (instance.student_id, instance.section_id)
+    if previous == current:
+        return
+    changes = Counter()
+    if previous is not None:
+        semester_id, hours = _section_load(previous[1])
+        changes[previous[0], semester_id] -= hours
+    semester_id, hours = _section_load(instance.section_id)
+    changes[instance.student_id, semester_id] += hours
+    adjust(changes, max_credit_hours())
+
+
+def _registration_deleted(sender, instance, **kwargs):
+    load = _section_load(instance.section_id)
+    if load is not None:
+        adjust({(instance.student_id, load[0]): -load[1]})
+
+
+def _course_saved(sender, instance, created, raw=False, **kwargs):
+    before = stored(instance)
+    if raw or before is None or before['credit_hours'] == instance.credit_hours:
+        return
+    delta = instance.credit_hours - before['credit_hours']
+    rows = (Registration.objects
+            .filter(section__course=instance)
+            .order_by()
+            .values('student_id', 'section__semester_id')
+            .annotate(registrations=Count('pk')))
+    with transaction.atomic():
+        adjust_many({(row['student_id'], row['section__semester_id']): delta * row['registrations']
+                     for row in rows})
+
+
+def _section_saved(sender, instance, created, raw=False, **kwargs):
+    before = stored(instance)
+    if raw or before is None:
+        return
+    previous = (before['semester_id'], before['course__credit_hours'])
+    current = (instance.semester_id,
+               Course.objects.values_list('credit_hours', flat=True).get(pk=instance.course_id))
+    if previous == current:
+        return
+    # every student registered in the section moves with it
+    changes = Counter()
+    for student_id in instance.registrations.order_by().values_list('student_id', flat=True):
+        changes[student_id, previous[0]] -= previous[1]
+        changes[student_id, current[0]] += current[1]
+    with transaction.atomic():
+        adjust_many(changes)
+
+
+def connect_signals():
+    post_save.connect(_registration_saved, sender=Registration,
+                      dispatch_uid='courseInfo.credits.registration.save')
+    post_delete.connect(_registration_deleted, sender=Registration,
+                        dispatch_uid='courseInfo.credits.registration.delete')
+    post_save.connect(_course_saved, sender=Course,
+                      dispatch_uid='courseInfo.credits.course.save')
+    post_save.connect(_section_saved, sender=Section,
+                      dispatch_uid='courseInfo.credits.section.save')
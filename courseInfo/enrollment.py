@@ -0,0 +1,192 @@
+"""
+Set-based enrollment of many (student, section) pairs at once.
+
+Instead of validating and inserting one Registration per request, the
+whole set is checked with a handful of pk IN (...) queries and the
+survivors are written with bulk_create() inside one transaction.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import cache, credits
+from .models import Registration, Section, Student, StudentSemesterLoad
+from .prerequisites import completed_courses, get_state, missing_prerequisites
+from .timetickets import closed_reason, window_table
+
+# per-pair outcomes reported by bulk_enroll()
+CREATED = 'created'
+VALID = 'valid'
+SKIPPED = 'skipped'
+DUPLICATE = 'duplicate'
+ALREADY_REGISTERED = 'already_registered'
+UNKNOWN_STUDENT = 'unknown_student'
+UNKNOWN_SECTION = 'unknown_section'
+REGISTRATION_CLOSED = 'registration_closed'
+MISSING_PREREQUISITES = 'missing_prerequisites'
+CREDIT_LIMIT = 'credit_limit'
+
+# keeps every IN (...) list below SQLite's bound parameter limit
+CHUNK_SIZE = 900
+
+
+def chunked(values, size=CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def existing_rows(model, pks, *fields):
+    """{pk: (field, ...)} for the pks that exist."""
+    found = {}
+    for chunk in chunked(pks):
+        for row in (model.objects.filter(pk__in=chunk)
+                    .order_by().values_list('pk', *fields)):
+            found[row[0]] = row[1:]
+    return found
+
+
+def existing_registrations(pairs):
+    found = set()
+    section_ids = {section_id for _, section_id in pairs}
+    student_ids = {student_id for student_id, _ in pairs}
+    for chunk in chunked(section_ids):
+        rows = (Registration.objects
+                .filter(section_id__in=chunk)
+                .order_by()
+                .values_list('student_id', 'section_id'))
+        if len(student_ids) <= CHUNK_SIZE:
+            rows = rows.filter(student_id__in=student_ids)
+        found.update(rows)
+    return found & set(pairs)
+
+
+def prerequisite_failures(pairs, sections):
+    """
+    The pairs whose student has not taken a prerequisite of the section's
+    course: one query per semester involved, and only for courses that
+    have prerequisites at all.
+    """
+    state = get_state()
+    graph = state[0]
+    by_semester = {}
+    for pair in pairs:
+        _, course_id, year, period_sequence, _ = sections[pair[1]]
+        if graph.get(course_id):
+            by_semester.setdefault((year, period_sequence), []).append(pair)
+    failed = set()
+    for (year, period_sequence), semester_pairs in by_semester.items():
+        completed = {}
+        for chunk in chunked({student_id for student_id, _ in semester_pairs}):
+            completed.update(completed_courses(chunk, year, period_sequence))
+        for student_id, section_id in semester_pairs:
+            if missing_prerequisites(sections[section_id][1],
+                                     completed.get(student_id, ()), state):
+                failed.add((student_id, section_id))
+    return failed
+
+
+def current_loads(student_ids):
+    loads = {}
+    for chunk in chunked(student_ids):
+        loads.update(((student_id, semester_id), hours)
+                     for student_id, semester_id, hours in (
+                         StudentSemesterLoad.objects
+                         .filter(student_id__in=chunk)
+                         .order_by()
+                         .values_list('student_id', 'semester_id', 'credit_hours')))
+    return loads
+
+
+def check_pairs(pairs):
+    """
+    Return {pair: status} for every distinct pair, None meaning it can be
+    inserted, and the credit hours each insertable pair adds to the
+    student's semester as {(student_id, semester_id): hours}. Pairs are
+    weighed against the credit hour limit in input order.
+    """
+    seen = set(pairs)
+
+    students = existing_rows(Student, {student_id for student_id, _ in seen},
+                             'cohort', 'last_name')
+    sections = existing_rows(Section, {section_id for _, section_id in seen},
+                             'semester_id', 'course_id', 'semester__year__year',
+                             'semester__period__period_sequence', 'course__credit_hours')
+    known = {pair for pair in seen if pair[0] in students and pair[1] in sections}
+    registered = existing_registrations(known)
+    unprepared = prerequisite_failures(known - registered, sections)
+    windows = window_table()
+    now = timezone.now()
+    limit = credits.max_credit_hours()
+    loads = Counter(current_loads({student_id for student_id, _ in known}))
+    added = Counter()
+
+    statuses = {}
+    for pair in dict.fromkeys(pairs):
+        if pair[0] not in students:
+            statuses[pair] = UNKNOWN_STUDENT
+        elif pair[1] not in sections:
+            statuses[pair] = UNKNOWN_SECTION
+        elif pair in registered:
+            statuses[pair] = ALREADY_REGISTERED
+        elif closed_reason(windows, sections[pair[1]][0], *students[pair[0]], now=now):
+            statuses[pair] = REGISTRATION_CLOSED
+        elif pair in unprepared:
+            statuses[pair] = MISSING_PREREQUISITES
+        else:
+            semester_id, hours = sections[pair[1]][0], sections[pair[1]][4]
+            load = (pair[0], semester_id)
+            if limit is not None and loads[load] + added[load] + hours > limit:
+                statuses[pair] = CREDIT_LIMIT
+            else:
+                statuses[pair] = None
+                added[load] += hours
+    return statuses, added
+
+
+def bulk_enroll(pairs, dry_run=False, all_or_nothing=False, batch_size=500):
+    """
+    Register each (student_id, section_id) pair. Returns one
+    {'student_id', 'section_id', 'status'} dict per input pair, in input
+    order; a pair listed more than once is reported as a duplicate after
+    its first occurrence. With all_or_nothing, a single failing pair means
+    nobody is enrolled and the valid pairs are reported as skipped.
+    """
+    pairs = [(int(student_id), int(section_id)) for student_id, section_id in pairs]
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                statuses, added = check_pairs(pairs)
+                to_create = [pair for pair, status in statuses.items() if status is None]
+                failed = len(to_create) < len(statuses) or len(statuses) < len(pairs)
+                if all_or_nothing and failed:
+                    dry_run = True
+                if not dry_run:
+                    Registration.objects.bulk_create(
+                        [Registration(student_id=student_id, section_id=section_id)
+                         for student_id, section_id in to_create],
+                        batch_size=batch_size)
+                    credits.adjust_many(added, credits.max_credit_hours())
+            break
+        except (IntegrityError, credits.CreditLimitExceeded):
+            # someone registered one of the pairs (or started or raised a
+            # credit total) between the check and the insert; the second
+            # pass sees it
+            if attempt:
+                raise
+    if to_create and not dry_run:
+        # bulk_create() sends no post_save for courseInfo.cache to act on
+        cache.invalidate(Registration)
+
+    results = []
+    reported = set()
+    for pair in pairs:
+        if pair in reported:
+            status = DUPLICATE
+        else:
+            status = statuses[pair] or (
+                SKIPPED if all_or_nothing and failed else VALID if dry_run else CREATED)
+            reported.add(pair)
+        results.append({'student_id': pair[0], 'section_id': pair[1], 'status': status})
+    return results
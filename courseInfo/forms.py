@@ -1,6 +1,10 @@
 from django import forms
 
 from courseInfo.models import Instructor, Section, Course, Semester, Student, Registration
+from courseInfo.credits import current_load, max_credit_hours
+from courseInfo import refdata
+from courseInfo.prerequisites import completed_courses, missing_prerequisites
+from courseInfo.timetickets import closed_reason, window_table
 
 
 class InstructorForm(forms.ModelForm):
@@ -20,6 +24,10 @@ class SectionForm(forms.ModelForm):
         model = Section
         fields = '__all__'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        refdata.semester_choices(self.fields['semester'])
+
     def clean_first_name(self):
         return self.cleaned_data['section_name'].strip()
 
@@ -38,6 +46,14 @@ class SemesterForm(forms.ModelForm):
         model = Semester
         fields = '__all__'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # labels from the in-process reference data rather than a query each
+        data = refdata.get()
+        for name, choices in (('year', data.year_choices()), ('period', data.period_choices())):
+            field = self.fields[name]
+            field.choices = [('', field.empty_label)] + choices
+
     def clean_first_name(self):
         return self.cleaned_data['semester_name'].strip()
 
@@ -60,4 +76,81 @@ class StudentForm(forms.ModelForm):
 class RegistrationForm(forms.ModelForm):
     class Meta:
         model = Registration
-        fields = '__all__'
+        # grades are entered on the section's grade sheet, which needs
+        # change_registration rather than add_registration
+        exclude = ('grade',)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        student = cleaned_data.get('student')
+        section = cleaned_data.get('section')
+        if student is not None and section is not None:
+            reason = closed_reason(window_table(), section.semester_id,
+                                   student.cohort, student.last_name)
+            if reason is not None:
+                raise forms.ValidationError(reason)
+            self.check_prerequisites(student, section)
+            self.check_credit_hours(student, section)
+        return cleaned_data
+
+    def check_credit_hours(self, student, section):
+        limit = max_credit_hours()
+        if limit is None:
+            return
+        load = current_load(student.pk, section.semester_id)
+        previous = self.instance
+        if previous.pk is not None and previous.student_id == student.pk \
+                and previous.section.semester_id == section.semester_id:
+            # clean() runs before the form's values reach the instance, so
+            # it still describes the registration being edited
+            load -= previous.section.course.credit_hours
+        if load + section.course.credit_hours > limit:
+            raise forms.ValidationError(
+                'This registration would bring %s to %d credit hours in %s; the limit is %d.'
+                % (student, load + section.course.credit_hours, section.semester, limit))
+
+    def check_prerequisites(self, student, section):
+        semester = section.semester
+        completed = completed_courses(
+            [student.pk], semester.year.year, semester.period.period_sequence)
+        missing = missing_prerequisites(section.course_id, completed.get(student.pk, ()))
+        if missing:
+            raise forms.ValidationError(
+                'Missing prerequisites: %s.' % ', '.join(
+                    str(course) for course in Course.objects.filter(pk__in=missing)))
+
+
+class InstructorLoadForm(forms.Form):
+    SORT_CHOICES = [
+        ('name', 'Name'),
+        ('-sections', 'Most sections'),
+        ('sections', 'Fewest sections'),
+        ('-registrations', 'Most registrations'),
+        ('registrations', 'Fewest registrations'),
+    ]
+
+    semester = forms.ModelChoiceField(
+        queryset=Semester.objects.all(), required=False, empty_label='All semesters')
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        refdata.semester_choices(self.fields['semester'])
+
+
+class RegistrationCartForm(forms.Form):
+    student = forms.ModelChoiceField(queryset=Student.objects.all())
+    section = forms.ModelChoiceField(
+        queryset=Section.objects.select_related('course'))
+
+
+class SemesterRolloverForm(forms.Form):
+    target = forms.ModelChoiceField(queryset=Semester.objects.all(), label='Copy sections into')
+    dry_run = forms.BooleanField(required=False, label='Only count what would be copied')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        refdata.semester_choices(self.fields['target'])
+
+
+GradeFormSet = forms.modelformset_factory(Registration, fields=('grade',), extra=0)
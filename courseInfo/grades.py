@@ -0,0 +1,204 @@
+"""
+Grades and the totals kept from them.
+
+StudentGradeSummary (quality points and graded credit hours, hence the
+GPA) and SectionGradeCount (registrations per grade) are moved by the
+difference each grade change makes, never recomputed from the history:
+single saves through the signal handlers below, grade sheets through
+save_grades(), which writes every changed grade with one bulk_update().
+A section saved with a course of different credit hours moves the
+quality points of everyone graded in it, and has its grade counts
+recounted from its registrations.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save
+
+from .models import (
+    GRADE_CHOICES, Course, Registration, Section, SectionGradeCount, StudentGradeSummary)
+from .presave import stored
+
+GRADE_POINTS = {
+    'A': Decimal('4.0'), 'A-': Decimal('3.7'),
+    'B+': Decimal('3.3'), 'B': Decimal('3.0'), 'B-': Decimal('2.7'),
+    'C+': Decimal('2.3'), 'C': Decimal('2.0'), 'C-': Decimal('1.7'),
+    'D+': Decimal('1.3'), 'D': Decimal('1.0'), 'D-': Decimal('0.7'),
+    'F': Decimal('0.0'),
+}
+
+# grades that do not complete a course, e.g. for prerequisites
+NOT_PASSED = ['F', 'W']
+
+GRADE_ORDER = [grade for grade, _ in GRADE_CHOICES]
+
+
+class Changes:
+    """The differences a set of grade changes makes to the totals."""
+
+    def __init__(self):
+        self.students = defaultdict(lambda: [Decimal(0), 0])
+        self.sections = Counter()
+
+    def add(self, student_id, section_id, grade, credit_hours, sign=1):
+        if not grade:
+            return
+        self.sections[section_id, grade] += sign
+        if grade in GRADE_POINTS:
+            totals = self.students[student_id]
+            totals[0] += sign * GRADE_POINTS[grade] * credit_hours
+            totals[1] += sign * credit_hours
+
+    def apply(self):
+        self._apply_students()
+        self._apply_sections()
+
+    def _apply_students(self, chunk_size=500):
+        groups = defaultdict(list)
+        for student_id, (points, hours) in self.students.items():
+            if points or hours:
+                groups[points, hours].append(student_id)
+        # rows for students graded for the first time; the updates below
+        # then treat every student alike
+        StudentGradeSummary.objects.bulk_create(
+            [StudentGradeSummary(student_id=student_id)
+             for group in groups.values() for student_id in group],
+            batch_size=chunk_size, ignore_conflicts=True)
+        # one UPDATE for every student whose totals move by the same amount
+        for (points, hours), group in groups.items():
+            for start in range(0, len(group), chunk_size):
+                StudentGradeSummary.objects.filter(
+                    student_id__in=group[start:start + chunk_size],
+                ).update(quality_points=F('quality_points') + points,
+                         graded_hours=F('graded_hours') + hours)
+
+    def _apply_sections(self):
+        changed = {key: delta for key, delta in self.sections.items() if delta}
+        SectionGradeCount.objects.bulk_create(
+            [SectionGradeCount(section_id=section_id, grade=grade)
+             for section_id, grade in changed],
+            ignore_conflicts=True)
+        for (section_id, grade), delta in changed.items():
+            SectionGradeCount.objects.filter(section_id=section_id, grade=grade).update(
+                registrations=F('registrations') + delta)
+
+
+def save_grades(registrations, batch_size=500):
+    """
+    Save the grade of each registration, an instance whose grade was
+    changed in memory, with one bulk_update(); registration._grade_before
+    must hold the grade it had when it was read.
+    """
+    if not registrations:
+        return
+    hours = dict(Section.objects
+                 .filter(pk__in={registration.section_id for registration in registrations})
+                 .values_list('pk', 'course__credit_hours'))
+    changes = Changes()
+    for registration in registrations:
+        credit_hours = hours[registration.section_id]
+        changes.add(registration.student_id, registration.section_id,
+                    registration._grade_before, credit_hours, sign=-1)
+        changes.add(registration.student_id, registration.section_id,
+                    registration.grade, credit_hours)
+    with transaction.atomic():
+        Registration.objects.bulk_update(registrations, ['grade'], batch_size=batch_size)
+        changes.apply()
+
+
+def distribution(section):
+    """[(grade, registrations), ...] in grade order, from the maintained counts."""
+    counts = dict(section.grade_counts.filter(registrations__gt=0)
+                  .values_list('grade', 'registrations'))
+    return [(grade, counts[grade]) for grade in GRADE_ORDER if grade in counts]
+
+
+def recount_section(section_id):
+    """Set the section's grade counts from its registrations."""
+    counts = dict(Registration.objects
+                  .filter(section_id=section_id).exclude(grade='')
+                  .order_by().values_list('grade').annotate(Count('pk')))
+    SectionGradeCount.objects.filter(section_id=section_id).exclude(
+        grade__in=list(counts)).update(registrations=0)
+    SectionGradeCount.objects.bulk_create(
+        [SectionGradeCount(section_id=section_id, grade=grade) for grade in counts],
+        ignore_conflicts=True)
+    for grade, registrations in counts.items():
+        SectionGradeCount.objects.filter(section_id=section_id, grade=grade).update(
+            registrations=registrations)
+
+
+def _credit_hours(section_id):
+    return Section.objects.filter(pk=section_id).values_list(
+        'course__credit_hours', flat=True).first()
+
+
+def _registration_saved(sender, instance, raw=False, **kwargs):
+    before = stored(instance)
+    previous = before and (before['student_id'], before['section_id'], before['grade'])
+    current = (instance.student_id, instance.section_id, instance.grade)
+    if raw or previous == current or not (instance.grade or previous and previous[2]):
+        return
+    changes = Changes()
+    if previous is not None:
+        changes.add(*previous, _credit_hours(previous[1]), sign=-1)
+    changes.add(*current, _credit_hours(instance.section_id))
+    changes.apply()
+
+
+def _registration_deleted(sender, instance, **kwargs):
+    if instance.grade:
+        changes = Changes()
+        changes.add(instance.student_id, instance.section_id, instance.grade,
+                    _credit_hours(instance.section_id) or 0, sign=-1)
+        changes.apply()
+
+
+def _course_saved(sender, instance, raw=False, **kwargs):
+    before = stored(instance)
+    previous = before and before['credit_hours']
+    if raw or previous is None or previous == instance.credit_hours:
+        return
+    changes = Changes()
+    for row in (Registration.objects
+                .filter(section__course=instance, grade__in=list(GRADE_POINTS))
+                .order_by()
+                .values('student_id', 'section_id', 'grade')
+                .annotate(registrations=Count('pk'))):
+        for _ in range(row['registrations']):
+            changes.add(row['student_id'], row['section_id'], row['grade'], previous, sign=-1)
+            changes.add(row['student_id'], row['section_id'], row['grade'], instance.credit_hours)
+    with transaction.atomic():
+        changes.apply()
+
+
+def _section_saved(sender, instance, created, raw=False, **kwargs):
+    before = stored(instance)
+    if raw or before is None or before['course_id'] == instance.course_id:
+        return
+    previous = before['course__credit_hours']
+    current = Course.objects.values_list('credit_hours', flat=True).get(pk=instance.course_id)
+    if previous == current:
+        return
+    changes = Changes()
+    for student_id, grade in (instance.registrations
+                              .filter(grade__in=list(GRADE_POINTS))
+                              .order_by().values_list('student_id', 'grade')):
+        changes.add(student_id, instance.pk, grade, previous, sign=-1)
+        changes.add(student_id, instance.pk, grade, current)
+    with transaction.atomic():
+        changes.apply()
+        recount_section(instance.pk)
+
+
+def connect_signals():
+    post_save.connect(_registration_saved, sender=Registration,
+                      dispatch_uid='courseInfo.grades.registration.save')
+    post_delete.connect(_registration_deleted, sender=Registration,
+                        dispatch_uid='courseInfo.grades.registration.delete')
+    post_save.connect(_course_saved, sender=Course,
+                      dispatch_uid='courseInfo.grades.course.save')
+    post_save.connect(_section_saved, sender=Section,
+                      dispatch_uid='courseInfo.grades.section.save')
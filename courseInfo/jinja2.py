@@ -0,0 +1,27 @@
+"""
+Environment for the optional Jinja2 template set in courseInfo/jinja2/.
+
+The templates there are drop-in replacements for the Django templates of
+the same name and take the same context; they reach Django through the
+globals below: url() for {% url %}, static() for {% static %} and
+stylesheet_bundle() for the tag of the same name.
+"""
+from django.templatetags.static import static
+from django.urls import reverse
+from jinja2 import Environment
+
+from courseInfo.templatetags.courseinfo_static import stylesheet_bundle
+
+
+def url(viewname, *args, **kwargs):
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'stylesheet_bundle': stylesheet_bundle,
+        'url': url,
+    })
+    return env
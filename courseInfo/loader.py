@@ -0,0 +1,51 @@
+from collections import defaultdict
+
+
+class DataLoader:
+    """
+    Request-scoped row loader for API resources.
+
+    Callers first say which primary keys they will need with want(), then
+    call dispatch() once: every model with outstanding keys is read with a
+    single pk IN (...) query, however many callers asked for it and however
+    often the same key was asked for. Rows already seen during the request
+    are never fetched again.
+    """
+
+    def __init__(self, resources):
+        self.resources = resources
+        self.rows = defaultdict(dict)
+        self.pending = defaultdict(set)
+        self.queries = 0
+
+    def want(self, resource_name, pks):
+        known = self.rows[resource_name]
+        self.pending[resource_name].update(
+            pk for pk in pks if pk is not None and pk not in known)
+
+    def prime(self, resource_name, rows):
+        resource = self.resources[resource_name]
+        pk_name = resource.model._meta.pk.name
+        known = self.rows[resource_name]
+        for row in rows:
+            known.setdefault(row[pk_name], row)
+
+    def dispatch(self):
+        pending, self.pending = self.pending, defaultdict(set)
+        for resource_name, pks in pending.items():
+            if not pks:
+                continue
+            resource = self.resources[resource_name]
+            names = resource.defaults
+            # no ORDER BY: Meta.ordering would only add joins to the lookup
+            queryset = resource.model.objects.filter(pk__in=pks).order_by()
+            self.queries += 1
+            self.prime(resource_name, [
+                dict(zip(names, row)) for row in resource.rows(queryset, names)])
+
+    def get(self, resource_name, pk):
+        return self.rows[resource_name].get(pk)
+
+    def get_many(self, resource_name, pks):
+        known = self.rows[resource_name]
+        return [known[pk] for pk in pks if pk in known]
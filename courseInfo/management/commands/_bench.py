@@ -0,0 +1,91 @@
+import threading
+import time
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(timings):
+    """Return count, mean and p50/p95/p99 (in milliseconds) of timings in seconds."""
+    count = len(timings)
+    mean = sum(timings) / count if count else 0.0
+    return {
+        'count': count,
+        'mean': mean * 1000,
+        'p50': percentile(timings, 50) * 1000,
+        'p95': percentile(timings, 95) * 1000,
+        'p99': percentile(timings, 99) * 1000,
+    }
+
+
+def format_summary(label, timings, elapsed=None):
+    stats = summarize(timings)
+    line = ('{label:<40} n={count:<6} mean={mean:8.3f}ms p50={p50:8.3f}ms '
+            'p95={p95:8.3f}ms p99={p99:8.3f}ms').format(label=label, **stats)
+    if elapsed:
+        line += ' {:9.1f}/s'.format(stats['count'] / elapsed)
+    return line
+
+
+class QueryCounter:
+    """
+    Counts SQL statements across every thread that calls install() on its
+    own connection, e.g. at the start of each worker.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, connection):
+        connection.execute_wrappers.append(self)
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+
+
+class TemporaryUser:
+    """
+    A superuser that exists only inside the with block, together with the
+    Cookie header of a session logged in as that user.
+    """
+
+    def __init__(self, username='benchmark'):
+        self.username = username
+
+    def __enter__(self):
+        from django.conf import settings
+        from django.contrib.auth import (
+            BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model)
+        from importlib import import_module
+
+        self.user = get_user_model().objects.create_superuser(
+            self.username, '%s@example.com' % self.username, self.username)
+        store = import_module(settings.SESSION_ENGINE).SessionStore()
+        store[SESSION_KEY] = str(self.user.pk)
+        store[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        store[HASH_SESSION_KEY] = self.user.get_session_auth_hash()
+        store.save()
+        self.session = store
+        self.cookie = '%s=%s' % (settings.SESSION_COOKIE_NAME, store.session_key)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.session.delete()
+        self.user.delete()
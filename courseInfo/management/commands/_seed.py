@@ -0,0 +1,173 @@
+"""
+Synthetic catalogue data for the load test and benchmark commands.
+
+Generated rows carry a marker (years from SYNTHETIC_YEAR onwards, 'LT'
+course numbers and student first names, the 'LoadTest' instructor last
+name and building) so they are easy to tell apart. seed() also returns
+the primary keys of everything it created, and clear() deletes exactly
+those rows, never real data that happens to match a marker.
+"""
+import datetime
+import random
+
+from django.db import transaction
+from django.db.models import Max, Q
+
+from courseInfo import cache, credits
+from courseInfo.models import (
+    Course, Instructor, Period, Registration, Room, Section, Semester, Student, Year)
+
+SYNTHETIC_YEAR = 3000
+BATCH_SIZE = 500
+
+LAST_NAMES = [
+    'Adams', 'Baker', 'Clark', 'Davis', 'Evans', 'Foster', 'Garcia', 'Hughes',
+    'Iverson', 'Jones', 'King', 'Lopez', 'Miller', 'Nguyen', 'Owens', 'Patel',
+    'Quinn', 'Reed', 'Smith', 'Turner', 'Underwood', 'Vasquez', 'White',
+    'Xu', 'Young', 'Zimmerman',
+]
+
+DEFAULT_PERIODS = [(1, 'Spring'), (2, 'Summer'), (3, 'Fall')]
+
+# (days, minutes per meeting) of the usual weekly patterns
+MEETING_PATTERNS = [('MWF', 50), ('TR', 75), ('MW', 75), ('M', 150), ('T', 150),
+                    ('W', 150), ('R', 150)]
+SECTION_CAPACITIES = [15, 20, 25, 30, 30, 40, 40, 60, 100, 200]
+
+
+class Seeded:
+    """The primary keys of the rows one seed() call created, per model."""
+
+    def __init__(self):
+        self.pks = {}
+        self.semesters = []
+
+    def add(self, model, pks):
+        self.pks.setdefault(model, []).extend(pks)
+
+    def get(self, model):
+        return self.pks.get(model, [])
+
+
+def bulk_create(model, objs):
+    """bulk_create() objs and return the primary keys they were given."""
+    last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    created = model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    if created and created[0].pk is not None:
+        return [obj.pk for obj in created]
+    # backends that don't return them: the rows added after the highest
+    # primary key, which the surrounding transaction keeps to ours
+    return list(model.objects.filter(pk__gt=last).order_by('pk')
+                .values_list('pk', flat=True))
+
+
+def meeting_time(rng):
+    days, length = rng.choice(MEETING_PATTERNS)
+    start = rng.randrange(8 * 60, 21 * 60 - length, 30)
+    end = start + length
+    return days, datetime.time(start // 60, start % 60), datetime.time(end // 60, end % 60)
+
+
+@transaction.atomic
+def seed(years=1, courses=200, instructors=100, students=2000,
+         sections_per_course=3, registrations_per_student=0, rooms=0, rng=None):
+    rng = rng or random.Random(0)
+    seeded = Seeded()
+    periods = list(Period.objects.all())
+    if not periods:
+        periods = [Period.objects.create(period_sequence=sequence, period_name=name)
+                   for sequence, name in DEFAULT_PERIODS]
+        seeded.add(Period, [period.pk for period in periods])
+
+    first_year = max(
+        SYNTHETIC_YEAR,
+        (Year.objects.filter(year__gte=SYNTHETIC_YEAR)
+         .order_by('-year').values_list('year', flat=True).first() or 0) + 1)
+    seeded.add(Year, bulk_create(Year, [Year(year=first_year + i) for i in range(years)]))
+    seeded.add(Semester, bulk_create(
+        Semester, [Semester(year_id=year_id, period=period)
+                   for year_id in seeded.get(Year) for period in periods]))
+    seeded.semesters = list(Semester.objects.filter(pk__in=seeded.get(Semester)))
+
+    first_course = Course.objects.filter(course_number__startswith='LT').count()
+    seeded.add(Course, bulk_create(
+        Course, [Course(course_number='LT%05d' % n, course_name='Synthetic Course %d' % n)
+                 for n in range(first_course, first_course + courses)]))
+    first_instructor = Instructor.objects.filter(last_name='LoadTest').count()
+    seeded.add(Instructor, bulk_create(
+        Instructor, [Instructor(first_name='Instructor%05d' % n, last_name='LoadTest')
+                     for n in range(first_instructor, first_instructor + instructors)]))
+    first_student = Student.objects.filter(first_name__startswith='LT').count()
+    seeded.add(Student, bulk_create(
+        Student, [Student(first_name='LT%07d' % n, last_name=rng.choice(LAST_NAMES))
+                  for n in range(first_student, first_student + students)]))
+
+    instructor_ids = list(Instructor.objects.filter(last_name='LoadTest')
+                          .values_list('pk', flat=True))
+    sections = []
+    for semester in seeded.semesters:
+        for course_id in seeded.get(Course):
+            for n in range(sections_per_course):
+                days, start_time, end_time = meeting_time(rng)
+                sections.append(Section(
+                    semester=semester, course_id=course_id,
+                    instructor_id=rng.choice(instructor_ids),
+                    section_name='%03d' % (n + 1),
+                    meeting_days=days, start_time=start_time, end_time=end_time,
+                    capacity=rng.choice(SECTION_CAPACITIES)))
+    seeded.add(Section, bulk_create(Section, sections))
+
+    first_room = Room.objects.filter(building='LoadTest').count()
+    seeded.add(Room, bulk_create(
+        Room, [Room(building='LoadTest', room_number='%05d' % n,
+                    capacity=rng.choice(SECTION_CAPACITIES))
+               for n in range(first_room, first_room + rooms)]))
+
+    if registrations_per_student:
+        section_ids = seeded.get(Section)
+        registrations = [
+            Registration(student_id=student_id, section_id=section_id)
+            for student_id in seeded.get(Student)
+            for section_id in rng.sample(
+                section_ids, min(registrations_per_student, len(section_ids)))]
+        seeded.add(Registration, bulk_create(Registration, registrations))
+        credits.adjust_many(registration_loads(registrations, seeded.semesters))
+    invalidate_all()
+    return seeded
+
+
+def registration_loads(registrations, semesters):
+    # bulk_create() skips the signals courseInfo.credits counts with
+    sections = {pk: (semester_id, hours) for pk, semester_id, hours in (
+        Section.objects.filter(semester__in=semesters)
+        .order_by().values_list('pk', 'semester_id', 'course__credit_hours'))}
+    loads = {}
+    for registration in registrations:
+        semester_id, hours = sections[registration.section_id]
+        key = (registration.student_id, semester_id)
+        loads[key] = loads.get(key, 0) + hours
+    return loads
+
+
+@transaction.atomic
+def clear(seeded):
+    """Delete the rows seed() returned in seeded, and whatever refers to them."""
+    if seeded is None:
+        return
+    sections = seeded.get(Section)
+    students = seeded.get(Student)
+    # the load test registers seeded students in seeded sections as well
+    Registration.objects.filter(
+        Q(pk__in=seeded.get(Registration)) | Q(section__in=sections)
+        | Q(student__in=students)).delete()
+    Section.objects.filter(Q(pk__in=sections) | Q(semester__in=seeded.get(Semester))).delete()
+    for model in (Room, Course, Instructor, Student, Semester, Year, Period):
+        model.objects.filter(pk__in=seeded.get(model)).delete()
+
+
+def invalidate_all():
+    # bulk_create() doesn't send the post_save signals that keep
+    # courseInfo.cache in step
+    for model in (Year, Period, Semester, Course, Instructor, Student,
+                  Room, Section, Registration):
+        cache.invalidate(model)
@@ -0,0 +1,16 @@
+from django.core.management.base import CommandError
+
+from courseInfo.models import Semester
+
+SEMESTER_HELP = "Semester id, or year and period such as '2020 Fall'."
+
+
+def get_semester(value):
+    semesters = Semester.objects.select_related('year', 'period')
+    try:
+        if value.isdigit():
+            return semesters.get(pk=int(value))
+        year, _, period = value.strip().partition(' ')
+        return semesters.get(year__year=int(year), period__period_name__iexact=period.strip())
+    except (Semester.DoesNotExist, ValueError):
+        raise CommandError('No semester %r.' % value)
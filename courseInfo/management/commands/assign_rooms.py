@@ -0,0 +1,53 @@
+import csv
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from courseInfo.models import Room, Section
+from courseInfo.rooms import assign_rooms
+
+from ._bench import Timer
+from ._semester import SEMESTER_HELP, get_semester
+
+
+class Command(BaseCommand):
+    help = ('Assign rooms to every scheduled section of a semester so that no '
+            'room is double booked and every section fits its room, then '
+            'report what was assigned and why any section was left without a '
+            'room.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('semester', help=SEMESTER_HELP)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Work out the assignment without saving it.')
+        parser.add_argument('--reassign', action='store_true',
+                            help='Ignore the rooms sections already have.')
+        parser.add_argument('--report',
+                            help='Write a section_id,section,room,status CSV here.')
+
+    def handle(self, *args, **options):
+        semester = get_semester(options['semester'])
+        with Timer() as timer:
+            result = assign_rooms(semester.pk, reassign=options['reassign'],
+                                  dry_run=options['dry_run'])
+        self.stdout.write('%s %d sections in %s, kept %d, left %d without a room (%.2fs).' % (
+            'Would assign' if options['dry_run'] else 'Assigned', len(result['assigned']),
+            semester, result['kept'], len(result['unassigned']), timer.elapsed))
+        for reason, count in sorted(Counter(result['unassigned'].values()).items()):
+            self.stdout.write('  %s: %d' % (reason, count))
+        if options['report']:
+            with open(options['report'], 'w', newline='') as report:
+                self.write_report(report, result)
+
+    def write_report(self, stream, result):
+        rooms = {room.pk: str(room) for room in Room.objects.all()}
+        section_ids = list(result['assigned']) + list(result['unassigned'])
+        labels = {section.pk: str(section) for section in Section.objects
+                  .filter(pk__in=section_ids)
+                  .select_related('course', 'semester__year', 'semester__period')}
+        writer = csv.writer(stream)
+        writer.writerow(['section_id', 'section', 'room', 'status'])
+        for section_id, room_id in result['assigned'].items():
+            writer.writerow([section_id, labels.get(section_id), rooms[room_id], 'assigned'])
+        for section_id, reason in result['unassigned'].items():
+            writer.writerow([section_id, labels.get(section_id), '', reason])
@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from courseInfo.api import RESOURCES, serialize
+
+from . import _seed
+from ._bench import Timer
+
+
+class Command(BaseCommand):
+    help = ('Measure API serialization throughput in rows per millisecond for '
+            'every resource, from values_list() rows and, for comparison, '
+            'from model instances rendered through __str__().')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20000)
+        parser.add_argument('--courses', type=int, default=1000)
+        parser.add_argument('--sections-per-course', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--no-seed', action='store_true')
+
+    def handle(self, *args, **options):
+        seeded = None
+        if not options['no_seed']:
+            seeded = _seed.seed(students=options['students'], courses=options['courses'],
+                                sections_per_course=options['sections_per_course'])
+        try:
+            self.stdout.write(
+                'rows per millisecond; "serialize" excludes the query, '
+                '"end to end" includes it')
+            self.stdout.write('{:<12} {:>8} {:>18} {:>18} {:>18} {:>18}'.format(
+                'resource', 'rows', 'serialize objects', 'serialize rows',
+                'end to end values', 'end to end models'))
+            for resource in RESOURCES.values():
+                self.bench(resource, options['repeat'])
+        finally:
+            _seed.clear(seeded)
+
+    def bench(self, resource, repeat):
+        names = list(resource.fields)
+        queryset = resource.model.objects.order_by('pk')
+        rows = list(resource.rows(queryset, names))
+        if not rows:
+            return
+        results = [
+            self.best(repeat, lambda: json.dumps(
+                serialize(names, rows, 'objects'), separators=(',', ':'))),
+            self.best(repeat, lambda: json.dumps(
+                serialize(names, rows, 'rows'), separators=(',', ':'))),
+            self.best(repeat, lambda: json.dumps(serialize(
+                names, resource.rows(queryset.all(), names)), separators=(',', ':'))),
+            # what rendering the HTML lists costs: an instance per row and
+            # a query per foreign key walked by __str__(); run once, since
+            # a second pass would hit the instances' relation caches
+            self.best(1, lambda: json.dumps(
+                [{'pk': instance.pk, 'label': str(instance)}
+                 for instance in queryset.all()], separators=(',', ':'))),
+        ]
+        self.stdout.write('{:<12} {:>8} {:>18.1f} {:>18.1f} {:>18.1f} {:>18.1f}'.format(
+            resource.name, len(rows), *[len(rows) / (best * 1000) for best in results]))
+
+    def best(self, repeat, function):
+        timings = []
+        for _ in range(repeat):
+            with Timer() as timer:
+                function()
+            timings.append(timer.elapsed)
+        return min(timings)
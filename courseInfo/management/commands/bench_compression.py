@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from courseInfo import middleware
+from courseInfo.middleware import compress, compress_stream
+
+from . import _seed
+from ._bench import TemporaryUser, Timer
+
+
+class Command(BaseCommand):
+    help = ('Measure bytes on the wire and CPU time of response compression '
+            'on a large RegistrationList page: gzip at every level, brotli '
+            'when it is installed, each compressed whole and as a stream.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--registrations-per-student', type=int, default=3)
+        parser.add_argument('--chunk-size', type=int, default=4096,
+                            help='Chunk size the page is cut into for the streamed runs.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--no-seed', action='store_true')
+
+    def handle(self, *args, **options):
+        seeded = None
+        if not options['no_seed']:
+            seeded = _seed.seed(students=options['students'],
+                                registrations_per_student=options['registrations_per_student'])
+        try:
+            with TemporaryUser() as user:
+                client = Client(HTTP_HOST='localhost', HTTP_COOKIE=user.cookie)
+                url = reverse('courseInfo_registration_list_urlpattern')
+                with Timer() as render:
+                    content = client.get(url).content
+                with Timer() as compressed_request:
+                    response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            self.stdout.write('{}: {:,} bytes, rendered in {:.1f}ms; {:.1f}ms with the '
+                              'middleware compressing ({}, {:,} bytes)'.format(
+                                  url, len(content), render.elapsed * 1000,
+                                  compressed_request.elapsed * 1000,
+                                  response.get('Content-Encoding', 'none'),
+                                  len(response.content)))
+            self.bench(content, options)
+        finally:
+            _seed.clear(seeded)
+
+    def bench(self, content, options):
+        chunk_size = options['chunk_size']
+        chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+        flush_size = getattr(settings, 'COURSEINFO_COMPRESSION_FLUSH_SIZE', 16 * 1024)
+        runs = [('gzip', level) for level in range(1, 10)]
+        if middleware.brotli is not None:
+            runs += [('br', quality) for quality in (1, 3, 5, 7, 9, 11)]
+        else:
+            self.stdout.write('brotli is not installed; gzip only')
+        self.stdout.write('{:<10} {:>12} {:>8} {:>10} {:>12} {:>10} {:>10}'.format(
+            'coding', 'bytes', 'ratio', 'ms', 'MB/s', 'stream', 'stream ms'))
+        for coding, level in runs:
+            whole, whole_time = self.best(
+                options['repeat'], lambda: compress(coding, level, content))
+            streamed, stream_time = self.best(
+                options['repeat'],
+                lambda: b''.join(compress_stream(coding, level, chunks, flush_size)))
+            self.stdout.write('{:<10} {:>12,} {:>8.3f} {:>10.2f} {:>12.1f} {:>10,} {:>10.2f}'.format(
+                '%s-%d' % (coding, level), len(whole), len(whole) / len(content),
+                whole_time * 1000, len(content) / whole_time / 1e6,
+                len(streamed), stream_time * 1000))
+
+    def best(self, repeat, function):
+        timings = []
+        for _ in range(repeat):
+            with Timer() as timer:
+                result = function()
+            timings.append(timer.elapsed)
+        return result, min(timings)
@@ -0,0 +1,80 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from ._bench import QueryCounter, Timer, format_summary
+
+
+class Command(BaseCommand):
+    help = ('Measure per-request session overhead for each session mode with '
+            'many concurrently logged-in users. Sessions are written to the '
+            'configured database and caches and removed afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.1,
+            help='Fraction of requests that modify the session.')
+        parser.add_argument(
+            '--modes', nargs='+', default=list(settings.SESSION_ENGINES),
+            choices=list(settings.SESSION_ENGINES))
+
+    def handle(self, *args, **options):
+        for mode in options['modes']:
+            engine = import_module(settings.SESSION_ENGINES[mode])
+            self.run_mode(mode, engine.SessionStore, options)
+
+    def run_mode(self, mode, store_class, options):
+        keys = [self.login(store_class, user_id)
+                for user_id in range(1, options['users'] + 1)]
+        counter = QueryCounter()
+        rng = random.Random(mode)
+        plan = [(rng.randrange(len(keys)), rng.random() < options['write_ratio'])
+                for _ in range(options['requests'])]
+        chunks = [plan[i::options['threads']] for i in range(options['threads'])]
+
+        def worker(chunk):
+            counter.install(connection)
+            timings = []
+            try:
+                for index, write in chunk:
+                    with Timer() as timer:
+                        keys[index] = self.request(store_class, keys[index], write)
+                    timings.append(timer.elapsed)
+            finally:
+                connection.close()
+            return timings
+
+        with Timer() as total:
+            with ThreadPoolExecutor(options['threads']) as pool:
+                timings = [t for chunk in pool.map(worker, chunks) for t in chunk]
+
+        self.stdout.write(format_summary(mode, timings, total.elapsed))
+        self.stdout.write('{:<40} {:.3f} queries/request'.format(
+            '', counter.count / float(len(timings))))
+        for key in keys:
+            store_class(key).delete()
+
+    def login(self, store_class, user_id):
+        store = store_class()
+        store['_auth_user_id'] = str(user_id)
+        store['_auth_user_backend'] = 'django.contrib.auth.backends.ModelBackend'
+        store['_auth_user_hash'] = '%040x' % user_id
+        store.save()
+        return store.session_key
+
+    def request(self, store_class, session_key, write):
+        # what SessionMiddleware and AuthenticationMiddleware do per request
+        store = store_class(session_key)
+        store.get('_auth_user_id')
+        if write:
+            store['last_activity'] = time.time()
+            store.save()
+        return store.session_key
@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.db.models import Count
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+
+from courseInfo.models import Registration, Section, Student
+from courseInfo.views import section_roster
+
+from . import _seed
+from ._bench import TemporaryUser, Timer
+
+
+class Command(BaseCommand):
+    help = ('Compare render time per 1,000 rows of the Django templates and '
+            'their Jinja2 versions in courseInfo/jinja2 for the registration '
+            'list, the student list and the section roster. Rows are read '
+            'before timing starts, so only rendering is measured.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--no-seed', action='store_true')
+
+    def handle(self, *args, **options):
+        try:
+            from django.template.backends.jinja2 import Jinja2
+        except ImportError:
+            raise CommandError('The Jinja2 package is not installed.')
+        django_engine = next(engine for engine in engines.all()
+                             if isinstance(engine, DjangoTemplates))
+        jinja2_engine = next((engine for engine in engines.all() if isinstance(engine, Jinja2)), None)
+        if jinja2_engine is None:
+            jinja2_engine = Jinja2({
+                'NAME': 'jinja2', 'DIRS': [], 'APP_DIRS': True,
+                'OPTIONS': {
+                    'environment': 'courseInfo.jinja2.environment',
+                    'context_processors': django_engine.engine.context_processors,
+                },
+            })
+
+        rows = options['rows']
+        seeded = None
+        if not options['no_seed']:
+            # one course, so the largest section's roster is long too
+            seeded = _seed.seed(students=rows, courses=1, sections_per_course=1,
+                                registrations_per_student=1)
+        try:
+            with TemporaryUser() as user:
+                request = RequestFactory().get('/')
+                request.user = user.user
+                self.stdout.write('{:<40} {:>8} {:>14} {:>14} {:>8}'.format(
+                    'template', 'rows', 'django ms/1k', 'jinja2 ms/1k', 'speedup'))
+                for name, context, count in self.pages(rows):
+                    timings = [self.best(options['repeat'], engine.get_template(name),
+                                         context, request)
+                               for engine in (django_engine, jinja2_engine)]
+                    self.stdout.write('{:<40} {:>8} {:>14.2f} {:>14.2f} {:>7.1f}x'.format(
+                        name, count, *[t * 1000 * 1000 / max(count, 1) for t in timings],
+                        timings[0] / timings[1]))
+        finally:
+            _seed.clear(seeded)
+
+    def pages(self, rows):
+        registrations = list(Registration.objects.select_related(
+            'student', 'section__course').order_by('pk')[:rows])
+        yield 'courseInfo/registration_list.html', {
+            'registration_list': registrations}, len(registrations)
+
+        students = list(Student.objects.order_by('last_name', 'first_name', 'pk')[:rows])
+        yield 'courseInfo/student_list.html', {'student_list': students}, len(students)
+
+        section = (Section.objects
+                   .select_related('course', 'semester', 'instructor', 'room')
+                   .filter(course__course_number__startswith='LT')
+                   .annotate(registration_count=Count('registrations'))
+                   .order_by('-registration_count').first())
+        if section is not None:
+            # the whole roster on one page, rather than SectionDetail's 50
+            page = Paginator(list(section_roster(section)[:rows]), rows).get_page(1)
+            yield 'courseInfo/section_detail.html', {
+                'section': section, 'course': section.course,
+                'semester': section.semester, 'instructor': section.instructor,
+                'roster': page.object_list, 'paginator': page.paginator, 'page_obj': page,
+                'is_paginated': False, 'grade_distribution': []}, len(page.object_list)
+
+    def best(self, repeat, template, context, request):
+        timings = []
+        for _ in range(repeat):
+            with Timer() as timer:
+                template.render(context, request)
+            timings.append(timer.elapsed)
+        return min(timings)
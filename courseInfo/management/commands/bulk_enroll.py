@@ -0,0 +1,55 @@
+import csv
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courseInfo.enrollment import bulk_enroll
+
+
+class Command(BaseCommand):
+    help = ('Enroll students into sections from a CSV file of student_id, '
+            'section_id rows (a header row is optional) in one transaction, '
+            'writing a per-pair result report as CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help="Path to the CSV file, or '-' for stdin.")
+        parser.add_argument('--report', help='Write the per-pair report here '
+                                             'instead of to stdout.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate every pair without enrolling anyone.')
+
+    def handle(self, *args, **options):
+        pairs = self.read_pairs(options['csv_file'])
+        results = bulk_enroll(pairs, dry_run=options['dry_run'])
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as report:
+                self.write_report(report, results)
+        else:
+            self.write_report(self.stdout, results)
+        summary = Counter(result['status'] for result in results)
+        self.stderr.write(', '.join(
+            '%s: %d' % (status, count) for status, count in sorted(summary.items())))
+
+    def read_pairs(self, path):
+        source = sys.stdin if path == '-' else open(path, newline='')
+        pairs = []
+        with source:
+            for line_number, row in enumerate(csv.reader(source), 1):
+                if not row or not ''.join(row).strip():
+                    continue
+                try:
+                    pairs.append((int(row[0]), int(row[1])))
+                except (IndexError, ValueError):
+                    if line_number == 1:
+                        continue  # header
+                    raise CommandError('Line %d: expected student_id,section_id, got %r.'
+                                       % (line_number, row))
+        return pairs
+
+    def write_report(self, stream, results):
+        writer = csv.writer(stream)
+        writer.writerow(['student_id', 'section_id', 'status'])
+        for result in results:
+            writer.writerow([result['student_id'], result['section_id'], result['status']])
@@ -0,0 +1,295 @@
+import http.cookiejar
+import random
+import re
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Permission
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import Resolver404, resolve, reverse
+
+from courseInfo.models import Section, Student
+
+from . import _seed
+from ._bench import Timer, summarize
+
+USER_PREFIX = 'loadtest'
+PASSWORD = 'loadtest-password'
+
+LIST_URLS = [
+    'courseInfo_instructor_list_urlpattern',
+    'courseInfo_section_list_urlpattern',
+    'courseInfo_course_list_urlpattern',
+    'courseInfo_semester_list_urlpattern',
+    'courseInfo_student_list_urlpattern',
+    'courseInfo_registration_list_urlpattern',
+]
+
+DETAIL_URLS = {
+    'courseInfo_section_detail_urlpattern': Section,
+    'courseInfo_student_detail_urlpattern': Student,
+}
+
+DEFAULT_MIX = 'login:5,browse:55,detail:20,register:20'
+
+_csrf_input = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class TestClientDriver:
+    """Sends requests through Django's test client, in this process."""
+
+    def __init__(self, base_url=None):
+        hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+        self.client = Client(HTTP_HOST=hosts[0] if hosts else 'localhost')
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, ''
+
+    def post(self, path, data, form_path=None):
+        response = self.client.post(path, data)
+        return response.status_code
+
+
+class LiveServerDriver:
+    """Sends real HTTP requests to a running server, keeping cookies."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            NoRedirect())
+
+    def open(self, path, data=None):
+        if data is not None:
+            data = urllib.parse.urlencode(data).encode()
+        try:
+            with self.opener.open(self.base_url + path, data) as response:
+                return response.status, response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as error:
+            return error.code, ''
+
+    def get(self, path):
+        return self.open(path)
+
+    def post(self, path, data, form_path=None):
+        # CSRF checks are real here: fetch the form for a token first
+        status, body = self.open(form_path or path)
+        match = _csrf_input.search(body)
+        if match:
+            data = dict(data, csrfmiddlewaretoken=match.group(1))
+        return self.open(path, data)[0]
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, path, elapsed, ok):
+        try:
+            name = resolve(urllib.parse.urlsplit(path).path).url_name
+        except Resolver404:
+            name = path
+        with self.lock:
+            self.timings[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+
+
+class VirtualUser:
+    def __init__(self, username, driver, catalogue, recorder, rng):
+        self.username = username
+        self.driver = driver
+        self.catalogue = catalogue
+        self.recorder = recorder
+        self.rng = rng
+
+    def timed(self, path, send, ok_statuses=(200, 302)):
+        with Timer() as timer:
+            try:
+                status = send()
+            except Exception:
+                # the test client re-raises view exceptions, e.g. a locked
+                # SQLite database under concurrent writes
+                status = None
+        self.recorder.record(path, timer.elapsed, status in ok_statuses)
+
+    def login(self):
+        self.timed(reverse('logout_urlpattern'),
+                   lambda: self.driver.get(reverse('logout_urlpattern'))[0])
+        path = reverse('login_urlpattern')
+        self.timed(path, lambda: self.driver.post(
+            path, {'username': self.username, 'password': PASSWORD}),
+            ok_statuses=(302,))
+
+    def browse(self):
+        name = self.rng.choice(LIST_URLS)
+        path = reverse(name)
+        pages = self.catalogue['pages'].get(name)
+        if pages:
+            path += '?page=%d' % self.rng.randint(1, pages)
+        self.timed(path, lambda: self.driver.get(path)[0])
+
+    def detail(self):
+        name = self.rng.choice(list(DETAIL_URLS))
+        pk = self.rng.choice(self.catalogue[DETAIL_URLS[name]])
+        path = reverse(name, kwargs={'pk': pk})
+        self.timed(path, lambda: self.driver.get(path)[0])
+
+    def register(self):
+        path = reverse('courseInfo_registration_create_urlpattern')
+        data = {'student': self.rng.choice(self.catalogue[Student]),
+                'section': self.rng.choice(self.catalogue[Section])}
+        # a 200 is the form coming back with a duplicate registration error
+        self.timed(path, lambda: self.driver.post(path, data), ok_statuses=(200, 302))
+
+
+class Command(BaseCommand):
+    help = ('Seed synthetic years, semesters, courses, instructors, students '
+            'and sections, then replay a registration-day mix of logins, list '
+            'browsing, detail views and registration POSTs from concurrent '
+            'virtual users, reporting latency percentiles and throughput per '
+            'URL name.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=1)
+        parser.add_argument('--courses', type=int, default=200)
+        parser.add_argument('--instructors', type=int, default=100)
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--sections-per-course', type=int, default=3)
+        parser.add_argument('--registrations-per-student', type=int, default=2)
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Reuse synthetic data from an earlier run.')
+        parser.add_argument('--users', type=int, default=20,
+                            help='Concurrent virtual users.')
+        parser.add_argument('--actions', type=int, default=50,
+                            help='Actions per virtual user.')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help='Relative action weights, default %s.' % DEFAULT_MIX)
+        parser.add_argument('--live-url',
+                            help='Base URL of a running server to drive instead '
+                                 'of the in-process test client.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Leave the synthetic data and users in place.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options['mix'])
+        rng = random.Random(options['seed'])
+        seeded = None
+        if not options['no_seed']:
+            with Timer() as timer:
+                seeded = _seed.seed(
+                    years=options['years'], courses=options['courses'],
+                    instructors=options['instructors'], students=options['students'],
+                    sections_per_course=options['sections_per_course'],
+                    registrations_per_student=options['registrations_per_student'],
+                    rng=rng)
+            self.stdout.write('Seeded synthetic data in %.1fs' % timer.elapsed)
+        usernames = self.create_users(options['users'])
+        try:
+            recorder, elapsed = self.run(usernames, mix, rng, options)
+            self.report(recorder, elapsed)
+        finally:
+            get_user_model().objects.filter(username__in=usernames).delete()
+            if not options['keep']:
+                _seed.clear(seeded)
+
+    def parse_mix(self, value):
+        mix = {}
+        for item in value.split(','):
+            action, _, weight = item.partition(':')
+            if action not in ('login', 'browse', 'detail', 'register'):
+                raise CommandError('Unknown action %r in --mix.' % action)
+            mix[action] = float(weight or 1)
+        return mix
+
+    def create_users(self, count):
+        user_model = get_user_model()
+        password = make_password(PASSWORD)
+        usernames = ['%s%04d' % (USER_PREFIX, n) for n in range(count)]
+        user_model.objects.filter(username__in=usernames).delete()
+        user_model.objects.bulk_create(
+            [user_model(username=username, password=password) for username in usernames])
+        permissions = Permission.objects.filter(
+            content_type__app_label='courseInfo',
+            codename__regex=r'^(view_.*|add_registration)$')
+        through = user_model.user_permissions.through
+        through.objects.bulk_create(
+            [through(user_id=user_id, permission_id=permission.pk)
+             for user_id in user_model.objects.filter(username__in=usernames)
+                                              .values_list('pk', flat=True)
+             for permission in permissions])
+        return usernames
+
+    def catalogue(self):
+        students = list(Student.objects.filter(first_name__startswith='LT')
+                        .values_list('pk', flat=True)) or \
+            list(Student.objects.values_list('pk', flat=True))
+        sections = list(Section.objects.filter(course__course_number__startswith='LT')
+                        .values_list('pk', flat=True)) or \
+            list(Section.objects.values_list('pk', flat=True))
+        if not students or not sections:
+            raise CommandError('There are no students or sections to register.')
+        pages = {}
+        for name in LIST_URLS:
+            view_class = resolve(reverse(name)).func.view_class
+            if getattr(view_class, 'paginate_by', None):
+                count = view_class.model.objects.count()
+                pages[name] = max(1, -(-count // view_class.paginate_by))
+        return {Student: students, Section: sections, 'pages': pages}
+
+    def run(self, usernames, mix, rng, options):
+        catalogue = self.catalogue()
+        recorder = Recorder()
+        driver_class = LiveServerDriver if options['live_url'] else TestClientDriver
+        actions, weights = zip(*mix.items())
+        plans = [(username, random.Random(rng.random())) for username in usernames]
+
+        def virtual_user(plan):
+            username, user_rng = plan
+            user = VirtualUser(username, driver_class(options['live_url']),
+                               catalogue, recorder, user_rng)
+            try:
+                user.login()
+                for action in user_rng.choices(actions, weights, k=options['actions']):
+                    getattr(user, action)()
+            finally:
+                connection.close()
+
+        with Timer() as total:
+            with ThreadPoolExecutor(len(plans)) as pool:
+                list(pool.map(virtual_user, plans))
+        return recorder, total.elapsed
+
+    def report(self, recorder, elapsed):
+        header = '{:<45} {:>7} {:>6} {:>9} {:>9} {:>9} {:>9}'.format(
+            'url name', 'n', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        total = 0
+        for name in sorted(recorder.timings):
+            stats = summarize(recorder.timings[name])
+            total += stats['count']
+            self.stdout.write('{:<45} {:>7} {:>6} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.1f}'.format(
+                name, stats['count'], recorder.errors[name],
+                stats['p50'], stats['p95'], stats['p99'], stats['count'] / elapsed))
+        self.stdout.write('-' * len(header))
+        self.stdout.write('%d requests in %.1fs, %.1f req/s overall' % (
+            total, elapsed, total / elapsed))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courseInfo.rollover import roll_over
+
+from ._semester import SEMESTER_HELP, get_semester
+
+
+class Command(BaseCommand):
+    help = ('Copy every section (course, section name, instructor, meeting '
+            'times and capacity) of one semester into another. Sections the '
+            'target semester already has are skipped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help=SEMESTER_HELP)
+        parser.add_argument('target', help=SEMESTER_HELP)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be copied without writing anything.')
+
+    def handle(self, *args, **options):
+        source = get_semester(options['source'])
+        target = get_semester(options['target'])
+        if source == target:
+            raise CommandError('The source and target semesters are the same.')
+        copied, skipped = roll_over([source.pk], target.pk, dry_run=options['dry_run'])
+        self.stdout.write('%s %d sections from %s to %s, skipped %d already there.' % (
+            'Would copy' if options['dry_run'] else 'Copied', copied, source, target, skipped))
@@ -0,0 +1,39 @@
+"""
+Section meeting times as bitsets.
+
+A week is laid out as 7 * 1440 bits, one per minute, so the meetings of a
+section become a single int and two sections clash exactly when their
+masks share a bit: `a & b` is one machine-level operation however many
+days and hours are involved, and a room's or a student's whole timetable
+is the OR of the masks placed in it.
+"""
+DAYS = 'MTWRFSU'
+MINUTES_PER_DAY = 24 * 60
+
+
+def minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def meeting_mask(days, start_time, end_time):
+    """The bitset for meetings on days from start_time to end_time; 0 if unscheduled."""
+    if not days or start_time is None or end_time is None:
+        return 0
+    start, end = minutes(start_time), minutes(end_time)
+    if end <= start:
+        return 0
+    block = ((1 << (end - start)) - 1) << start
+    mask = 0
+    for day in days:
+        mask |= block << (DAYS.index(day) * MINUTES_PER_DAY)
+    return mask
+
+
+def clean_days(days):
+    """Upper case meeting days in week order; ValueError for an unknown day."""
+    days = days.upper().replace(' ', '')
+    unknown = set(days) - set(DAYS)
+    if unknown:
+        raise ValueError('Unknown meeting day %s; use the letters %s.' % (
+            ', '.join(sorted(unknown)), DAYS))
+    return ''.join(day for day in DAYS if day in days)
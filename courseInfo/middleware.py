@@ -0,0 +1,353 @@
+import time
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_vary_headers
+from django.utils.http import is_safe_url
+
+from courseInfo import cache
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+class WaitingRoom:
+    """
+    Admission control kept entirely in the cache.
+
+    Visitors draw a ticket from the 'issued' counter. Tickets up to the
+    'served' counter have been let through the gate, and each of those may
+    take one of a fixed number of slots; a slot is a lease that lapses when
+    its holder stops making requests, or is given back by leave() once they
+    have registered. When slots are free, whoever polls
+    next moves the gate forward by that many tickets, in ticket order, so
+    the line stays first come, first served. A released ticket is held a
+    reservation for a few refreshes; a ticket whose holder stopped polling
+    before reaching the gate is passed over without one.
+    """
+
+    def __init__(self, store, slots, lease, patience):
+        self.store = store
+        self.slots = slots
+        self.lease = lease
+        self.patience = patience
+
+    def key(self, *parts):
+        return ':'.join([cache.KEY_PREFIX, 'waitingroom'] + [str(part) for part in parts])
+
+    def counter(self, name):
+        self.store.add(self.key(name), 0, None)
+        return self.store.get(self.key(name)) or 0
+
+    def issue(self):
+        self.store.add(self.key('issued'), 0, None)
+        ticket = self.store.incr(self.key('issued'))
+        self.seen(ticket)
+        return ticket
+
+    def seen(self, ticket):
+        self.store.set(self.key('seen', ticket), 1, self.patience)
+
+    def renew(self, ticket, slot):
+        """Extend the lease on slot; False if it now belongs to someone else."""
+        key = self.key('slot', slot)
+        holder = self.store.get(key)
+        if holder is None:
+            return self.store.add(key, ticket, self.lease)
+        if holder != ticket:
+            return False
+        self.store.set(key, ticket, self.lease)
+        return True
+
+    def leave(self, ticket, slot):
+        """Give slot back for the next in line, if ticket still holds it."""
+        key = self.key('slot', slot)
+        if self.store.get(key) == ticket:
+            self.store.delete(key)
+
+    def free_slots(self):
+        keys = [self.key('slot', slot) for slot in range(self.slots)]
+        taken = self.store.get_many(keys)
+        return [slot for slot, key in enumerate(keys) if key not in taken]
+
+    def claim(self, ticket):
+        for slot in self.free_slots():
+            if self.store.add(self.key('slot', slot), ticket, self.lease):
+                self.store.delete(self.key('reserved', ticket))
+                return slot
+        return None
+
+    def release(self, served):
+        """Let as many tickets through the gate as there are unclaimed slots."""
+        free = len(self.free_slots())
+        if not free:
+            return served
+        window = range(max(1, served - 4 * self.slots + 1), served + 1)
+        free -= len(self.store.get_many([self.key('reserved', n) for n in window]))
+        issued = self.counter('issued')
+        while free > 0 and served < issued:
+            ticket = served + 1
+            # add() makes sure only one request moves the gate past a ticket
+            if self.store.add(self.key('released', ticket), 1, self.lease):
+                served = self.store.incr(self.key('served'))
+                if self.store.get(self.key('seen', ticket)) is not None:
+                    self.store.set(self.key('reserved', ticket), 1, self.patience)
+                    free -= 1
+            else:
+                # another request is moving the gate; leave it to them
+                return self.counter('served')
+        return served
+
+    def admit(self, ticket):
+        """
+        Return (ticket, slot, position). slot is None while the visitor must
+        wait; ticket differs from the one passed in if it lapsed.
+        """
+        served = self.counter('served')
+        if ticket is None or (
+                ticket <= served
+                and self.store.get(self.key('reserved', ticket)) is None):
+            ticket = self.issue()
+        else:
+            self.seen(ticket)
+        if ticket > served:
+            served = self.release(served)
+        if ticket <= served:
+            slot = self.claim(ticket)
+            if slot is not None:
+                return ticket, slot, 0
+        return ticket, None, max(1, ticket - served)
+
+
+class WaitingRoomMiddleware:
+    """
+    Hold visitors to the registration URLs in COURSEINFO_WAITING_ROOM_URLS
+    in a queue so that at most COURSEINFO_WAITING_ROOM_SLOTS of them are
+    registering at once. Everyone else gets a small holding page that
+    refreshes itself until their turn comes. A successful POST to one of
+    COURSEINFO_WAITING_ROOM_DONE_URLS gives the visitor's slot back at once
+    rather than when the lease lapses.
+
+    Nothing here reads the session, the user or the database: the ticket
+    travels in a signed cookie and the queue lives in the cache, so a
+    waiting visitor costs a few cache operations per refresh.
+    """
+    cookie_name = 'courseinfo_waiting_room'
+    salt = 'courseInfo.middleware.WaitingRoomMiddleware'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.url_names = set(getattr(settings, 'COURSEINFO_WAITING_ROOM_URLS', ()))
+        self.slots = getattr(settings, 'COURSEINFO_WAITING_ROOM_SLOTS', 0)
+        self.refresh = getattr(settings, 'COURSEINFO_WAITING_ROOM_REFRESH', 5)
+        self.lease = getattr(settings, 'COURSEINFO_WAITING_ROOM_LEASE', 300)
+        self.done_url_names = set(getattr(settings, 'COURSEINFO_WAITING_ROOM_DONE_URLS', ()))
+        if self.slots and not cache.is_atomic():
+            # tickets and slots are handed out with add() and incr(); done
+            # as a read and a write, two visitors could get the same one
+            raise ImproperlyConfigured(
+                'The waiting room needs a cache with atomic add() and incr(), '
+                'such as redis; set COURSEINFO_WAITING_ROOM_SLOTS to 0 to turn '
+                'it off with the %s backend.' % type(cache.get_cache()).__name__)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        ticket = getattr(request, 'waiting_room_ticket', None)
+        if ticket is not None and ticket[1] is not None and self.is_done(request, response):
+            self.room().leave(*ticket)
+            response.delete_cookie(self.cookie_name)
+        elif ticket is not None:
+            response.set_signed_cookie(
+                self.cookie_name, '%d:%s' % ticket, salt=self.salt,
+                max_age=self.lease, httponly=True, samesite='Lax')
+        return response
+
+    def room(self):
+        return WaitingRoom(cache.get_cache(), self.slots, self.lease,
+                           patience=3 * self.refresh)
+
+    def is_done(self, request, response):
+        # the create and commit views redirect once the registration is saved
+        # and render the form again when it isn't
+        return (request.method == 'POST'
+                and request.resolver_match.url_name in self.done_url_names
+                and response.status_code in (301, 302, 303))
+
+    def read_ticket(self, request):
+        value = request.get_signed_cookie(
+            self.cookie_name, default=None, salt=self.salt, max_age=self.lease)
+        try:
+            ticket, slot = value.split(':')
+            return int(ticket), int(slot) if slot != 'None' else None
+        except (AttributeError, ValueError):
+            return None, None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.slots or request.resolver_match.url_name not in self.url_names:
+            return None
+        room = self.room()
+        ticket, slot = self.read_ticket(request)
+        if slot is not None and room.renew(ticket, slot):
+            request.waiting_room_ticket = (ticket, slot)
+            return None
+        ticket, slot, position = room.admit(None if slot is not None else ticket)
+        request.waiting_room_ticket = (ticket, slot)
+        if slot is not None:
+            return None
+        return self.holding_page(request, position)
+
+    def holding_page(self, request, position):
+        context = {'position': position, 'refresh': self.refresh}
+        if request.method == 'POST':
+            # the submission is not kept; a refresh must not GET a POST-only
+            # URL, so the page goes back to the form the visitor came from
+            # and says it needs sending again
+            context['resubmit'] = True
+            referer = request.META.get('HTTP_REFERER')
+            if referer and is_safe_url(referer, allowed_hosts={request.get_host()},
+                                       require_https=request.is_secure()):
+                context['next_url'] = referer
+        # rendered without the request, so no context processor can look
+        # up the user or the messages
+        response = HttpResponse(
+            render_to_string('courseInfo/waiting_room.html', context),
+            status=503)
+        response['Retry-After'] = str(self.refresh)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+)
+
+
+def accepted_codings(accept_encoding):
+    """The content-codings an Accept-Encoding header allows, ignoring q=0."""
+    codings = set()
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        params = params.replace(' ', '').lower()
+        if not coding:
+            continue
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        codings.add(coding)
+    return codings
+
+
+class Compressor:
+    """Incremental gzip ('gzip') or brotli ('br') compression."""
+
+    def __init__(self, coding, level):
+        if coding == 'br':
+            self.compressor = brotli.Compressor(quality=level)
+            self.compress = self.compressor.process
+            self.flush = self.compressor.flush
+            self.finish = self.compressor.finish
+        else:
+            # wbits 31: a deflate stream inside a gzip header and trailer
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self.compress = self.compressor.compress
+            self.flush = lambda: self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self.compressor.flush
+
+
+def compress(coding, level, content):
+    compressor = Compressor(coding, level)
+    return compressor.compress(content) + compressor.finish()
+
+
+def compress_stream(coding, level, chunks, flush_size, flush_interval=None):
+    """
+    Compress chunks as they come. Output is flushed once flush_size bytes
+    have gone in since the last flush, or with the first chunk to arrive
+    flush_interval seconds or more after it: flushing after every chunk
+    would keep a stream of one CSV row per chunk from compressing at all,
+    but a slow stream must still reach the client as it goes. A flush_size
+    of 1 flushes every chunk.
+    """
+    compressor = Compressor(coding, level)
+    pending = 0
+    flushed = time.monotonic()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_size or (
+                flush_interval is not None and time.monotonic() - flushed >= flush_interval):
+            data += compressor.flush()
+            pending = 0
+            flushed = time.monotonic()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress text responses for clients that accept it: with brotli when
+    the brotli package is installed and the client asks for br, otherwise
+    with gzip. A StreamingHttpResponse is compressed chunk by chunk as it
+    is sent, so it still never sits in memory whole; every chunk of a
+    COURSEINFO_COMPRESSION_FLUSH_TYPES stream (JSON lines, whose client
+    reads each line as it comes) is flushed on its own. Responses that
+    already have a Content-Encoding, that are shorter than
+    COURSEINFO_COMPRESSION_MIN_LENGTH or that compression would not
+    shrink go out as they are.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.level = getattr(settings, 'COURSEINFO_COMPRESSION_LEVEL', 6)
+        self.brotli_quality = getattr(settings, 'COURSEINFO_COMPRESSION_BROTLI_QUALITY', 5)
+        self.min_length = getattr(settings, 'COURSEINFO_COMPRESSION_MIN_LENGTH', 500)
+        self.flush_size = getattr(settings, 'COURSEINFO_COMPRESSION_FLUSH_SIZE', 16 * 1024)
+        self.flush_interval = getattr(settings, 'COURSEINFO_COMPRESSION_FLUSH_INTERVAL', 0.5)
+        self.flush_types = tuple(getattr(
+            settings, 'COURSEINFO_COMPRESSION_FLUSH_TYPES', ['application/x-ndjson']))
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if response.has_header('Content-Encoding') or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        patch_vary_headers(response, ['Accept-Encoding'])
+        codings = accepted_codings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in codings:
+            coding, level = 'br', self.brotli_quality
+        elif 'gzip' in codings:
+            coding, level = 'gzip', self.level
+        else:
+            return response
+
+        if response.streaming:
+            flush_size = 1 if content_type in self.flush_types else self.flush_size
+            response.streaming_content = compress_stream(
+                coding, level, response.streaming_content, flush_size, self.flush_interval)
+            del response['Content-Length']
+        else:
+            if len(response.content) < self.min_length:
+                return response
+            compressed = compress(coding, level, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # the bytes differ from those the ETag was computed over
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courseInfo', '0013_create_group_permission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='cohort',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='RegistrationWindow',
+            fields=[
+                ('registration_window_id', models.AutoField(primary_key=True, serialize=False)),
+                ('cohort', models.CharField(blank=True, default='', max_length=20)),
+                ('last_name_from', models.CharField(blank=True, default='', max_length=1)),
+                ('last_name_to', models.CharField(blank=True, default='', max_length=1)),
+                ('opens_at', models.DateTimeField()),
+                ('closes_at', models.DateTimeField(blank=True, null=True)),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registration_windows', to='courseInfo.Semester')),
+            ],
+            options={
+                'ordering': ['semester', 'opens_at'],
+            },
+        ),
+    ]
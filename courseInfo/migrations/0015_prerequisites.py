@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courseInfo', '0014_registration_windows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Prerequisite',
+            fields=[
+                ('prerequisite_id', models.AutoField(primary_key=True, serialize=False)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prerequisites', to='courseInfo.Course')),
+                ('required_course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='required_for', to='courseInfo.Course')),
+            ],
+            options={
+                'ordering': ['course', 'required_course'],
+                'unique_together': {('course', 'required_course')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:43
+
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def count_student_loads(apps, schema_editor):
+    Registration = apps.get_model('courseInfo', 'Registration')
+    StudentSemesterLoad = apps.get_model('courseInfo', 'StudentSemesterLoad')
+    loads = (Registration.objects
+             .order_by()
+             .values('student_id', 'section__semester_id')
+             .annotate(credit_hours=Sum('section__course__credit_hours')))
+    StudentSemesterLoad.objects.bulk_create([
+        StudentSemesterLoad(student_id=load['student_id'],
+                            semester_id=load['section__semester_id'],
+                            credit_hours=load['credit_hours'])
+        for load in loads], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courseInfo', '0015_prerequisites'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='credit_hours',
+            field=models.PositiveSmallIntegerField(default=3),
+        ),
+        migrations.CreateModel(
+            name='StudentSemesterLoad',
+            fields=[
+                ('student_semester_load_id', models.AutoField(primary_key=True, serialize=False)),
+                ('credit_hours', models.IntegerField(default=0)),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_loads', to='courseInfo.Semester')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='semester_loads', to='courseInfo.Student')),
+            ],
+            options={
+                'ordering': ['semester', 'student'],
+                'unique_together': {('student', 'semester')},
+            },
+        ),
+        migrations.RunPython(count_student_loads, migrations.RunPython.noop),
+    ]
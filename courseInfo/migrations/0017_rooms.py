@@ -0,0 +1,56 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courseInfo', '0016_credit_hours'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='section',
+            options={'ordering': ['course__course_number', 'section_name', 'semester__year__year', 'semester__period__period_sequence']},
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='capacity',
+            field=models.PositiveIntegerField(default=30),
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='end_time',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='meeting_days',
+            field=models.CharField(blank=True, default='', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='start_time',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Room',
+            fields=[
+                ('room_id', models.AutoField(primary_key=True, serialize=False)),
+                ('building', models.CharField(max_length=45)),
+                ('room_number', models.CharField(max_length=10)),
+                ('capacity', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['building', 'room_number'],
+                'unique_together': {('building', 'room_number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='room',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sections', to='courseInfo.Room'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courseInfo', '0017_rooms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='grade',
+            field=models.CharField(blank=True, choices=[('A', 'A'), ('A-', 'A-'), ('B+', 'B+'), ('B', 'B'), ('B-', 'B-'), ('C+', 'C+'), ('C', 'C'), ('C-', 'C-'), ('D+', 'D+'), ('D', 'D'), ('D-', 'D-'), ('F', 'F'), ('W', 'W (withdrawn)')], default='', max_length=2),
+        ),
+        migrations.CreateModel(
+            name='StudentGradeSummary',
+            fields=[
+                ('student_grade_summary_id', models.AutoField(primary_key=True, serialize=False)),
+                ('quality_points', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('graded_hours', models.IntegerField(default=0)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='grade_summary', to='courseInfo.Student')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SectionGradeCount',
+            fields=[
+                ('section_grade_count_id', models.AutoField(primary_key=True, serialize=False)),
+                ('grade', models.CharField(choices=[('A', 'A'), ('A-', 'A-'), ('B+', 'B+'), ('B', 'B'), ('B-', 'B-'), ('C+', 'C+'), ('C', 'C'), ('C-', 'C-'), ('D+', 'D+'), ('D', 'D'), ('D-', 'D-'), ('F', 'F'), ('W', 'W (withdrawn)')], max_length=2)),
+                ('registrations', models.IntegerField(default=0)),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_counts', to='courseInfo.Section')),
+            ],
+            options={
+                'ordering': ['section', 'grade'],
+                'unique_together': {('section', 'grade')},
+            },
+        ),
+    ]
@@ -1,5 +1,8 @@
-from django.db import models
-from django.urls import reverse
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from courseInfo import refdata
+from courseInfo.urlcache import url_for
 
 
 class Year(models.Model):
@@ -31,16 +34,20 @@ class Semester(models.Model):
     period = models.ForeignKey(Period, related_name='semesters', on_delete=models.PROTECT)
 
     def __str__(self):
-        return '%s - %s' % (self.year.year, self.period.period_name)
+        try:
+            return refdata.semester_label(self.year_id, self.period_id)
+        except KeyError:
+            # unsaved, or saved since this process took its snapshot
+            return '%s - %s' % (self.year.year, self.period.period_name)
 
     def get_absolute_url(self):
-        return reverse('courseInfo_semester_detail_urlpattern', kwargs={'pk':self.pk})
+        return url_for('courseInfo_semester_detail_urlpattern', self.pk)
 
     def get_update_url(self):
-        return reverse('courseInfo_semester_update_urlpattern', kwargs={'pk': self.pk})
+        return url_for('courseInfo_semester_update_urlpattern', self.pk)
 
     def get_delete_url(self):
-        return reverse('courseInfo_semester_delete_urlpattern', kwargs={'pk': self.pk})
+        return url_for('courseInfo_semester_delete_urlpattern', self.pk)
 
     class Meta:
         ordering =['year__year', 'period__period_sequence']
@@ -51,29 +58,50 @@ class Course(models.Model):
     course_id = models.AutoField(primary_key=True)
     course_number = models.CharField(max_length=20)
     course_name = models.CharField(max_length=225)
+    credit_hours = models.PositiveSmallIntegerField(default=3)
 
     def __str__(self):
         return '%s - %s' % (self.course_number, self.course_name)
 
     def get_absolute_url(self):
-        return reverse('courseInfo_course_detail_urlpattern',
-                       kwargs={'pk': self.pk})
+        return url_for('courseInfo_course_detail_urlpattern', self.pk)
 
     def get_update_url(self):
-        return reverse('courseInfo_course_update_urlpattern',
-                       kwargs={'pk': self.pk}
-                       )
+        return url_for('courseInfo_course_update_urlpattern', self.pk)
 
     def get_delete_url(self):
-        return reverse('courseInfo_course_delete_urlpattern',
-                       kwargs={'pk': self.pk}
-                       )
+        return url_for('courseInfo_course_delete_urlpattern', self.pk)
 
     class Meta:
         ordering = ['course_number', 'course_name']
         unique_together = (('course_number', 'course_name'),)
 
 
+class Prerequisite(models.Model):
+    """course may only be taken after required_course."""
+    prerequisite_id = models.AutoField(primary_key=True)
+    course = models.ForeignKey(Course, related_name='prerequisites', on_delete=models.CASCADE)
+    required_course = models.ForeignKey(Course, related_name='required_for', on_delete=models.CASCADE)
+
+    def __str__(self):
+        return '%s requires %s' % (self.course.course_number, self.required_course.course_number)
+
+    def clean(self):
+        from courseInfo.prerequisites import would_create_cycle
+        if self.course_id is None or self.required_course_id is None:
+            return
+        if self.course_id == self.required_course_id:
+            raise ValidationError('A course cannot require itself.')
+        if would_create_cycle(self.course_id, self.required_course_id):
+            raise ValidationError(
+                '%s already requires %s, directly or through other courses.'
+                % (self.required_course, self.course))
+
+    class Meta:
+        ordering = ['course', 'required_course']
+        unique_together = (('course', 'required_course'),)
+
+
 class Instructor(models.Model):
     instructor_id = models.AutoField(primary_key=True)
     first_name = models.CharField(max_length=45)
@@ -83,18 +111,13 @@ class Instructor(models.Model):
         return '%s, %s' % (self.last_name, self.first_name)
 
     def get_absolute_url(self):
-        return reverse('courseInfo_instructor_detail_urlpattern',
-                       kwargs={'pk': self.pk})
+        return url_for('courseInfo_instructor_detail_urlpattern', self.pk)
 
     def get_update_url(self):
-        return reverse('courseInfo_instructor_update_urlpattern',
-                       kwargs={'pk': self.pk}
-                       )
+        return url_for('courseInfo_instructor_update_urlpattern', self.pk)
 
     def get_delete_url(self):
-        return reverse('courseInfo_instructor_delete_urlpattern',
-                       kwargs={'pk': self.pk}
-                       )
+        return url_for('courseInfo_instructor_delete_urlpattern', self.pk)
 
     class Meta:
         ordering = ['last_name', 'first_name']
@@ -106,6 +129,7 @@ class Student(models.Model):
     first_name = models.CharField(max_length=45)
     last_name = models.CharField(max_length=45)
     nickname = models.CharField(max_length=45, blank=True, default='')
+    cohort = models.CharField(max_length=20, blank=True, default='')
 
     def __str__(self):
         result = ''
@@ -116,75 +140,204 @@ class Student(models.Model):
         return result
 
     def get_absolute_url(self):
-        return reverse('courseInfo_student_detail_urlpattern',
-                       kwargs={'pk': self.pk})
+        return url_for('courseInfo_student_detail_urlpattern', self.pk)
 
     def get_update_url(self):
-        return reverse('courseInfo_student_update_urlpattern',
-                       kwargs={'pk': self.pk}
-                       )
+        return url_for('courseInfo_student_update_urlpattern', self.pk)
 
     def get_delete_url(self):
-        return reverse('courseInfo_student_delete_urlpattern',
-                       kwargs={'pk': self.pk}
-                       )
+        return url_for('courseInfo_student_delete_urlpattern', self.pk)
 
     class Meta:
         ordering = ['last_name', 'first_name', 'nickname']
         unique_together = (('last_name', 'first_name', 'nickname'),)
 
 
+class RegistrationWindow(models.Model):
+    """
+    When a group of students may register for a semester: the students of
+    one cohort, those whose last name starts with a letter from
+    last_name_from to last_name_to, or both. A blank cohort or letter
+    range matches everyone. Once a semester has any windows, students no
+    window matches cannot register for it.
+    """
+    registration_window_id = models.AutoField(primary_key=True)
+    semester = models.ForeignKey(Semester, related_name='registration_windows', on_delete=models.CASCADE)
+    cohort = models.CharField(max_length=20, blank=True, default='')
+    last_name_from = models.CharField(max_length=1, blank=True, default='')
+    last_name_to = models.CharField(max_length=1, blank=True, default='')
+    opens_at = models.DateTimeField()
+    closes_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        group = self.cohort or 'All students'
+        if self.last_name_from or self.last_name_to:
+            group = '%s %s-%s' % (group, self.last_name_from or 'A', self.last_name_to or 'Z')
+        return '%s: %s' % (self.semester, group)
+
+    class Meta:
+        ordering = ['semester', 'opens_at']
+
+
+class Room(models.Model):
+    room_id = models.AutoField(primary_key=True)
+    building = models.CharField(max_length=45)
+    room_number = models.CharField(max_length=10)
+    capacity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return '%s %s' % (self.building, self.room_number)
+
+    class Meta:
+        ordering = ['building', 'room_number']
+        unique_together = (('building', 'room_number'),)
+
+
 class Section(models.Model):
     section_id = models.AutoField(primary_key=True)
     section_name = models.CharField(max_length=10)
     semester = models.ForeignKey(Semester, related_name='sections', on_delete=models.PROTECT)
     course = models.ForeignKey(Course, related_name='sections', on_delete=models.PROTECT)
     instructor = models.ForeignKey(Instructor, related_name='sections', on_delete=models.PROTECT)
+    # days as letters from courseInfo.meetings.DAYS, e.g. 'MWF' or 'TR'
+    meeting_days = models.CharField(max_length=7, blank=True, default='')
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    capacity = models.PositiveIntegerField(default=30)
+    room = models.ForeignKey(Room, related_name='sections', null=True, blank=True, on_delete=models.SET_NULL)
 
     def __str__(self):
-        return '%s - %s (%s)' % (self.course.course_number, self.section_name, self.semester.__str__())
+        semester = refdata.get().semester_labels.get(self.semester_id)
+        if semester is None:
+            semester = self.semester.__str__()
+        return '%s - %s (%s)' % (self.course.course_number, self.section_name, semester)
+
+    def clean(self):
+        from courseInfo.meetings import clean_days
+        try:
+            self.meeting_days = clean_days(self.meeting_days)
+        except ValueError as error:
+            raise ValidationError({'meeting_days': str(error)})
+        scheduled = [bool(self.meeting_days), self.start_time is not None, self.end_time is not None]
+        if any(scheduled) and not all(scheduled):
+            raise ValidationError('Give meeting days, start time and end time together, or none of them.')
+        if all(scheduled) and self.end_time <= self.start_time:
+            raise ValidationError({'end_time': 'The section must end after it starts.'})
 
     def get_absolute_url(self):
-        return reverse('courseInfo_section_detail_urlpattern',
-                       kwargs={'pk': self.pk})
+        return url_for('courseInfo_section_detail_urlpattern', self.pk)
 
     def get_update_url(self):
-        return reverse('courseInfo_section_update_urlpattern',
-                       kwargs={'pk': self.pk}
-                       )
+        return url_for('courseInfo_section_update_urlpattern', self.pk)
 
     def get_delete_url(self):
-        return reverse('courseInfo_section_delete_urlpattern',
-                       kwargs={'pk': self.pk}
-                       )
+        return url_for('courseInfo_section_delete_urlpattern', self.pk)
+
+    def get_grades_url(self):
+        return url_for('courseInfo_section_grades_urlpattern', self.pk)
+
+    def get_roster_url(self):
+        return url_for('courseInfo_section_roster_urlpattern', self.pk)
 
     class Meta:
-        ordering = ['course__course_number', 'section_name', 'semester__semester_name']
+        ordering = ['course__course_number', 'section_name', 'semester__year__year',
+                    'semester__period__period_sequence']
         unique_together = (('semester', 'course', 'section_name'),)
 
 
+GRADE_CHOICES = [
+    ('A', 'A'), ('A-', 'A-'),
+    ('B+', 'B+'), ('B', 'B'), ('B-', 'B-'),
+    ('C+', 'C+'), ('C', 'C'), ('C-', 'C-'),
+    ('D+', 'D+'), ('D', 'D'), ('D-', 'D-'),
+    ('F', 'F'),
+    ('W', 'W (withdrawn)'),
+]
+
+
 class Registration(models.Model):
     registration_id = models.AutoField(primary_key=True)
     student = models.ForeignKey(Student, related_name='registrations', on_delete=models.PROTECT)
     section = models.ForeignKey(Section, related_name='registrations', on_delete=models.PROTECT)
+    grade = models.CharField(max_length=2, blank=True, default='', choices=GRADE_CHOICES)
 
     def __str__(self):
         return '%s / %s' % (self.section, self.student)
 
+    # the signal handlers in courseInfo.credits and courseInfo.grades keep
+    # StudentSemesterLoad, StudentGradeSummary and SectionGradeCount in
+    # step; running them in the same transaction keeps the two consistent
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
     def get_absolute_url(self):
-        return reverse('courseInfo_registration_detail_urlpattern',
-                       kwargs={'pk': self.pk})
+        return url_for('courseInfo_registration_detail_urlpattern', self.pk)
 
     def get_update_url(self):
-        return reverse('courseInfo_registration_update_urlpattern',
-                       kwargs={'pk': self.pk}
-                       )
+        return url_for('courseInfo_registration_update_urlpattern', self.pk)
 
     def get_delete_url(self):
-        return reverse('courseInfo_registration_delete_urlpattern',
-                       kwargs={'pk': self.pk}
-                       )
+        return url_for('courseInfo_registration_delete_urlpattern', self.pk)
 
     class Meta:
         ordering = ['section', 'student']
         unique_together = (('section', 'student'),)
+
+
+class StudentSemesterLoad(models.Model):
+    """
+    The credit hours a student is registered for in a semester, maintained
+    by courseInfo.credits as registrations come and go.
+    """
+    student_semester_load_id = models.AutoField(primary_key=True)
+    student = models.ForeignKey(Student, related_name='semester_loads', on_delete=models.CASCADE)
+    semester = models.ForeignKey(Semester, related_name='student_loads', on_delete=models.CASCADE)
+    credit_hours = models.IntegerField(default=0)
+
+    def __str__(self):
+        return '%s / %s: %s' % (self.student, self.semester, self.credit_hours)
+
+    class Meta:
+        ordering = ['semester', 'student']
+        unique_together = (('student', 'semester'),)
+
+
+class StudentGradeSummary(models.Model):
+    """
+    A student's grade point totals, maintained by courseInfo.grades as
+    grades are entered, so the GPA never has to be summed from every
+    registration the student ever had.
+    """
+    student_grade_summary_id = models.AutoField(primary_key=True)
+    student = models.OneToOneField(Student, related_name='grade_summary', on_delete=models.CASCADE)
+    quality_points = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    graded_hours = models.IntegerField(default=0)
+
+    def __str__(self):
+        return '%s: %s' % (self.student, self.gpa)
+
+    @property
+    def gpa(self):
+        if not self.graded_hours:
+            return None
+        return round(self.quality_points / self.graded_hours, 2)
+
+
+class SectionGradeCount(models.Model):
+    """How many registrations of a section have each grade; see courseInfo.grades."""
+    section_grade_count_id = models.AutoField(primary_key=True)
+    section = models.ForeignKey(Section, related_name='grade_counts', on_delete=models.CASCADE)
+    grade = models.CharField(max_length=2, choices=GRADE_CHOICES)
+    registrations = models.IntegerField(default=0)
+
+    def __str__(self):
+        return '%s: %s x %s' % (self.section, self.grade, self.registrations)
+
+    class Meta:
+        ordering = ['section', 'grade']
+        unique_together = (('section', 'grade'),)
@@ -0,0 +1,116 @@
+"""
+The course prerequisite graph and its transitive closure.
+
+Both are kept through courseInfo.cache as one (graph, closure) pair:
+
+    graph    {course_id: {directly required course_id, ...}}
+    closure  {course_id: frozenset of every course it requires, however
+              indirectly}
+
+The pair is built from one query and kept until a Prerequisite changes
+(with locmem, whose other workers never see that change, for at most
+COURSEINFO_LOCAL_CACHE_TIMEOUT seconds); any edge change drops it rather
+than patching it in place, so concurrent edits can never leave a
+half-applied graph behind. Checking a registration is then set
+arithmetic on ids already in memory instead of a recursive walk through
+the database.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+
+from . import cache
+from .grades import NOT_PASSED
+from .models import Prerequisite, Registration
+
+
+def load_graph():
+    graph = {}
+    for course_id, required_id in Prerequisite.objects.order_by().values_list(
+            'course_id', 'required_course_id'):
+        graph.setdefault(course_id, set()).add(required_id)
+    return graph
+
+
+def close(graph, courses, closure):
+    """Fill in closure[course] for each of courses, reusing what is there."""
+    def visit(course, path):
+        if course in closure:
+            return closure[course]
+        required = set()
+        for required_id in graph.get(course, ()):
+            required.add(required_id)
+            if required_id not in path:
+                required |= visit(required_id, path | {course})
+        closure[course] = frozenset(required)
+        return closure[course]
+
+    for course in courses:
+        visit(course, frozenset())
+    return closure
+
+
+def build_state():
+    graph = load_graph()
+    return graph, close(graph, list(graph), {})
+
+
+def get_state():
+    return cache.get_or_set([Prerequisite], ('prerequisites',), build_state)
+
+
+def requires(course_id):
+    return get_state()[1].get(course_id, frozenset())
+
+
+def would_create_cycle(course_id, required_id):
+    """True if required_id already needs course_id, so the edge would loop."""
+    return course_id == required_id or course_id in requires(required_id)
+
+
+def missing_prerequisites(course_id, completed, state=None):
+    """
+    The direct prerequisites of course_id not covered by completed course
+    ids, counting a completed course as covering everything it requires.
+    """
+    graph, closure = state or get_state()
+    direct = graph.get(course_id)
+    if not direct:
+        return set()
+    covered = set(completed)
+    for done in completed:
+        covered |= closure.get(done, frozenset())
+    return direct - covered
+
+
+def completed_courses(student_ids, year, period_sequence):
+    """
+    {student_id: {course_id, ...}} of the courses each student registered
+    for in semesters before the given one, less those failed or withdrawn
+    from.
+    """
+    earlier = (Q(section__semester__year__year__lt=year)
+               | Q(section__semester__year__year=year,
+                   section__semester__period__period_sequence__lt=period_sequence))
+    completed = {}
+    for student_id, course_id in (Registration.objects
+                                  .filter(earlier, student_id__in=student_ids)
+                                  .exclude(grade__in=NOT_PASSED)
+                                  .order_by()
+                                  .values_list('student_id', 'section__course_id')):
+        completed.setdefault(student_id, set()).add(course_id)
+    return completed
+
+
+def _changed(sender, **kwargs):
+    # the save or delete already moved the version, but a request could
+    # read the old rows and cache them before this transaction commits;
+    # moving it again once the change is visible drops that state too
+    transaction.on_commit(lambda: cache.invalidate(Prerequisite))
+
+
+def connect_signals():
+    post_save.connect(_changed, sender=Prerequisite,
+                      dispatch_uid='courseInfo.prerequisites.save')
+    post_delete.connect(_changed, sender=Prerequisite,
+                        dispatch_uid='courseInfo.prerequisites.delete')
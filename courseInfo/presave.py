@@ -0,0 +1,36 @@
+"""
+The stored values of a row that is about to be saved.
+
+courseInfo.credits and courseInfo.grades both move their totals by the
+difference a save makes, so both need the Registration, Course or
+Section as it was before. The pre_save handler below reads what either
+of them needs with one query per save, and their post_save handlers
+take it from stored(instance) instead of each reading the row again.
+"""
+from django.db.models.signals import pre_save
+
+from .models import Course, Registration, Section
+
+FIELDS = {
+    Registration: ['student_id', 'section_id', 'grade'],
+    Course: ['credit_hours'],
+    Section: ['semester_id', 'course_id', 'course__credit_hours'],
+}
+
+
+def stored(instance):
+    """{field: value} as the row was before this save; None for a new row."""
+    return getattr(instance, '_presave_values', None)
+
+
+def _remember(sender, instance, raw=False, **kwargs):
+    instance._presave_values = None
+    if instance.pk is not None and not raw:
+        instance._presave_values = sender.objects.filter(pk=instance.pk).values(
+            *FIELDS[sender]).first()
+
+
+def connect_signals():
+    for model in FIELDS:
+        pre_save.connect(_remember, sender=model,
+                         dispatch_uid='courseInfo.presave.%s' % model._meta.label_lower)
@@ -0,0 +1,111 @@
+"""
+Year, Period and Semester rows kept in every process.
+
+The three tables are small and change a few times a year, yet every
+semester or section label used to read them again: a join, or a lazy
+query per row. get() instead returns a read-only snapshot of all of them,
+built once and kept in the process until the courseInfo.cache version of
+one of the three models changes. Saves and deletes bump that version
+(and bulk writes call cache.invalidate()), so every worker sharing the
+cache drops its snapshot; the shared version is read at most once every
+COURSEINFO_REFDATA_CHECK_INTERVAL seconds, and the process making the
+change drops its own snapshot at once.
+
+With a per-process cache (locmem, the default) other workers never see
+the version move, so there the snapshot is simply rebuilt from the
+database every COURSEINFO_REFDATA_CHECK_INTERVAL seconds instead.
+"""
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from courseInfo import cache
+
+_snapshot = None
+_checked = 0.0
+
+
+def _models():
+    from courseInfo.models import Period, Semester, Year
+    return [Year, Period, Semester]
+
+
+class ReferenceData:
+    """One read-only snapshot; replaced, never changed."""
+
+    def __init__(self, versions):
+        Year, Period, Semester = _models()
+        self.versions = versions
+        self.years = MappingProxyType(dict(Year.objects.values_list('pk', 'year')))
+        self.periods = MappingProxyType({
+            pk: (period_sequence, period_name)
+            for pk, period_sequence, period_name in Period.objects.values_list(
+                'pk', 'period_sequence', 'period_name')})
+        # a semester whose year or period was added after those were read
+        # waits for the next snapshot
+        semesters = sorted(
+            (row for row in Semester.objects.values_list('pk', 'year_id', 'period_id')
+             if row[1] in self.years and row[2] in self.periods),
+            key=lambda row: (self.years[row[1]], self.periods[row[2]][0]))
+        # in Semester.Meta.ordering order
+        self.semester_labels = MappingProxyType({
+            pk: self.semester_label(year_id, period_id)
+            for pk, year_id, period_id in semesters})
+
+    def semester_label(self, year_id, period_id):
+        return '%s - %s' % (self.years[year_id], self.periods[period_id][1])
+
+    def year_choices(self):
+        return sorted(self.years.items(), key=lambda item: item[1])
+
+    def period_choices(self):
+        return [(pk, period_name) for pk, (_, period_name)
+                in sorted(self.periods.items(), key=lambda item: item[1][0])]
+
+    def semester_choices(self):
+        return list(self.semester_labels.items())
+
+
+def get():
+    global _snapshot, _checked
+    snapshot = _snapshot
+    now = time.monotonic()
+    interval = getattr(settings, 'COURSEINFO_REFDATA_CHECK_INTERVAL', 1.0)
+    if snapshot is not None and now - _checked < interval:
+        return snapshot
+    # versions are read before the rows, so a change in between is picked
+    # up on the next check rather than missed; without a shared cache there
+    # are no versions to go by and the snapshot is simply rebuilt
+    versions = tuple(cache.get_versions(_models())) if cache.is_shared() else None
+    if snapshot is None or versions is None or snapshot.versions != versions:
+        snapshot = _snapshot = ReferenceData(versions)
+    _checked = now
+    return snapshot
+
+
+def clear(**kwargs):
+    global _snapshot
+    _snapshot = None
+
+
+def semester_label(year_id, period_id):
+    """'<year> - <period name>'; KeyError for rows the snapshot doesn't have yet."""
+    return get().semester_label(year_id, period_id)
+
+
+def semester_choices(field):
+    """Give a ModelChoiceField of semesters its choices from the snapshot."""
+    choices = get().semester_choices()
+    if field.empty_label is not None:
+        choices = [('', field.empty_label)] + choices
+    field.choices = choices
+
+
+def connect_signals():
+    for model in _models():
+        post_save.connect(clear, sender=model,
+                          dispatch_uid='courseInfo.refdata.save.%s' % model._meta.label_lower)
+        post_delete.connect(clear, sender=model,
+                            dispatch_uid='courseInfo.refdata.delete.%s' % model._meta.label_lower)
@@ -0,0 +1,50 @@
+"""
+Semester rollover: copy the sections of one semester into another.
+
+The source sections are read as plain rows and written back with batched
+bulk_create() calls, a handful of queries however many sections there
+are. Sections the target semester already has, the same course and
+section name, are skipped rather than raising on the (semester, course,
+section_name) constraint, so running a rollover twice is harmless.
+"""
+from django.db import transaction
+
+from . import cache
+from .models import Section
+
+# what a copied section keeps from the original; everything else, the
+# room included, is particular to the semester it runs in
+COPIED_FIELDS = ['course_id', 'section_name', 'instructor_id',
+                 'meeting_days', 'start_time', 'end_time', 'capacity']
+
+
+def roll_over(source_ids, target_id, dry_run=False, batch_size=500):
+    """
+    Copy the sections of the semesters in source_ids into semester
+    target_id. Returns (copied, skipped).
+    """
+    with transaction.atomic():
+        target = Section.objects.filter(semester_id=target_id).order_by()
+        existing = set(target.values_list('course_id', 'section_name'))
+        before = len(existing)
+        sections = []
+        skipped = 0
+        for row in (Section.objects
+                    .filter(semester_id__in=source_ids)
+                    .exclude(semester_id=target_id)
+                    .order_by('pk')
+                    .values(*COPIED_FIELDS)):
+            key = (row['course_id'], row['section_name'])
+            if key in existing:
+                skipped += 1
+                continue
+            existing.add(key)
+            sections.append(Section(semester_id=target_id, **row))
+        if dry_run or not sections:
+            return len(sections), skipped
+        # ignore_conflicts covers sections added since existing was read
+        Section.objects.bulk_create(sections, batch_size=batch_size, ignore_conflicts=True)
+        copied = target.count() - before
+    # bulk_create() sends no post_save for courseInfo.cache to act on
+    cache.invalidate(Section)
+    return copied, skipped + len(sections) - copied
@@ -0,0 +1,91 @@
+"""
+Assigning rooms to the sections of a semester.
+
+Every room's timetable is a courseInfo.meetings bitset, so "is this room
+free for this section" is one AND. Sections are placed largest first and,
+among equal sizes, in order of start time (the interval-scheduling order
+that keeps a room's day packed); each goes to the smallest room that
+seats it and is free at all of its meeting times. Rooms are kept sorted
+by capacity, so the first room large enough is found by bisection.
+
+Everything is read with two values_list() queries and the new rooms are
+written with batched bulk_update() calls.
+"""
+from bisect import bisect_left
+
+from django.db import transaction
+
+from . import cache
+from .meetings import meeting_mask, minutes
+from .models import Room, Section
+
+# why a section was left without a room
+UNSCHEDULED = 'unscheduled'
+TOO_LARGE = 'too_large'
+NO_FREE_ROOM = 'no_free_room'
+
+
+def assign_rooms(semester_id, reassign=False, dry_run=False, batch_size=500):
+    """
+    Give every scheduled section of the semester a room. Sections that
+    already have a room keep it while it still seats them without a clash,
+    unless reassign is set. Returns a dict with 'assigned' ({section_id:
+    room_id} for changed sections), 'kept' (a count) and 'unassigned'
+    ({section_id: reason}).
+    """
+    rooms = list(Room.objects.order_by('capacity', 'pk').values_list('pk', 'capacity'))
+    capacities = [capacity for _, capacity in rooms]
+    position = {room_id: i for i, (room_id, _) in enumerate(rooms)}
+    busy = [0] * len(rooms)
+
+    kept = 0
+    unassigned = {}
+    pending = []
+    current = {}
+    for section_id, days, start, end, capacity, room_id in (
+            Section.objects.filter(semester_id=semester_id).order_by().values_list(
+                'pk', 'meeting_days', 'start_time', 'end_time', 'capacity', 'room_id')):
+        mask = meeting_mask(days, start, end)
+        if not mask:
+            unassigned[section_id] = UNSCHEDULED
+            continue
+        current[section_id] = room_id
+        i = position.get(room_id)
+        if not reassign and i is not None and capacities[i] >= capacity and not busy[i] & mask:
+            busy[i] |= mask
+            kept += 1
+            continue
+        pending.append((-capacity, minutes(start), section_id, capacity, mask))
+
+    assigned = {}
+    pending.sort()
+    for _, _, section_id, capacity, mask in pending:
+        first = bisect_left(capacities, capacity)
+        if first == len(rooms):
+            unassigned[section_id] = TOO_LARGE
+            continue
+        for i in range(first, len(rooms)):
+            if not busy[i] & mask:
+                busy[i] |= mask
+                assigned[section_id] = rooms[i][0]
+                break
+        else:
+            unassigned[section_id] = NO_FREE_ROOM
+
+    changes = {section_id: room_id for section_id, room_id in assigned.items()
+               if current[section_id] != room_id}
+    kept += len(assigned) - len(changes)
+    # a section that lost its room must not keep the one it clashed in
+    changes.update({section_id: None for section_id, reason in unassigned.items()
+                    if reason != UNSCHEDULED and current[section_id] is not None})
+    if not dry_run and changes:
+        with transaction.atomic():
+            Section.objects.bulk_update(
+                [Section(pk=section_id, room_id=room_id) for section_id, room_id in changes.items()],
+                ['room'], batch_size=batch_size)
+        # bulk_update() sends no post_save for courseInfo.cache to act on
+        cache.invalidate(Section)
+    return {'assigned': {section_id: room_id for section_id, room_id in changes.items()
+                         if room_id is not None and section_id in assigned},
+            'kept': kept,
+            'unassigned': unassigned}
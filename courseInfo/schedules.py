@@ -0,0 +1,63 @@
+"""
+Enumerating clash-free schedules for a set of courses.
+
+Each course's sections are first grouped by meeting time (a
+courseInfo.meetings bitset), since sections that meet at the same times
+are interchangeable for the search; a schedule names, per course, the
+group of sections that fit. The search is a depth-first backtrack that
+takes the course with the fewest choices first, rejects a choice the
+moment it clashes (one AND against the bits already taken) and, after
+each choice, checks that every course still to place has at least one
+section left that fits, so dead ends are cut off early.
+"""
+from collections import OrderedDict
+
+from .meetings import meeting_mask
+
+
+def time_groups(rows):
+    """[(mask, [section_id, ...]), ...] from (section_id, days, start, end) rows."""
+    groups = OrderedDict()
+    for section_id, days, start_time, end_time in rows:
+        groups.setdefault(meeting_mask(days, start_time, end_time), []).append(section_id)
+    return list(groups.items())
+
+
+class ScheduleSearch:
+    """
+    Iterate over clash-free schedules, each a list holding one group of
+    section ids per course, in the order the courses were given. Stops
+    early, setting truncated, once max_nodes choices have been tried.
+    """
+
+    def __init__(self, options, max_nodes):
+        self.options = options
+        self.order = sorted(range(len(options)), key=lambda course: len(options[course]))
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.truncated = False
+
+    def __iter__(self):
+        chosen = [None] * len(self.options)
+        return self.search(0, 0, chosen)
+
+    def search(self, depth, busy, chosen):
+        if depth == len(self.order):
+            yield list(chosen)
+            return
+        course = self.order[depth]
+        later = [self.options[other] for other in self.order[depth + 1:]]
+        for mask, section_ids in self.options[course]:
+            if busy & mask:
+                continue
+            self.nodes += 1
+            if self.nodes > self.max_nodes:
+                self.truncated = True
+                return
+            taken = busy | mask
+            if any(all(taken & other_mask for other_mask, _ in groups) for groups in later):
+                continue
+            chosen[course] = section_ids
+            yield from self.search(depth + 1, taken, chosen)
+            if self.truncated:
+                return
@@ -0,0 +1,54 @@
+/*
+ * Infinite scrolling for list pages rendered with FragmentListMixin.
+ *
+ * The element carrying data-next-rows gets the next rows appended as the
+ * end of the list scrolls into view; the server sends just those rows
+ * (X-Fragment: rows) and the URL of the ones after them in X-Next-Page.
+ * Without fetch or IntersectionObserver the page links keep working.
+ */
+(function () {
+    'use strict';
+
+    var list = document.querySelector('[data-next-rows]');
+    if (!list || !window.fetch || !window.IntersectionObserver) {
+        return;
+    }
+    var next = list.getAttribute('data-next-rows');
+    var loading = false;
+    var end = document.createElement('div');
+    (list.tagName === 'TBODY' ? list.parentNode : list).insertAdjacentElement('afterend', end);
+    var pagination = document.querySelector('.pagination');
+    if (pagination) {
+        pagination.style.display = 'none';
+    }
+
+    var observer = new IntersectionObserver(function (entries) {
+        if (!entries[0].isIntersecting || loading || !next) {
+            return;
+        }
+        loading = true;
+        fetch(next, {headers: {'X-Fragment': 'rows'}, credentials: 'same-origin'})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                next = response.headers.get('X-Next-Page');
+                return response.text();
+            })
+            .then(function (rows) {
+                list.insertAdjacentHTML('beforeend', rows);
+                loading = false;
+                if (!next) {
+                    observer.disconnect();
+                }
+            })
+            .catch(function () {
+                // fall back to the page links
+                observer.disconnect();
+                if (pagination) {
+                    pagination.style.display = '';
+                }
+            });
+    }, {rootMargin: '200px'});
+    observer.observe(end);
+})();
@@ -0,0 +1,120 @@
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+
+from django.conf import settings
+
+from .middleware import accepted_codings
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.content_type = (mimetypes.guess_type(path)[0]
+                             or 'application/octet-stream')
+        self.immutable = immutable
+        # (content-coding, path, size, etag), best compression first; each
+        # variant is a different representation, so it gets its own ETag
+        self.variants = []
+        for coding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if os.path.exists(path + suffix):
+                size = os.path.getsize(path + suffix)
+                etag = '%s-%s"' % (self.etag[:-1], coding)
+                self.variants.append((coding, path + suffix, size, etag))
+
+    def select(self, accept_encoding):
+        codings = accepted_codings(accept_encoding)
+        for variant in self.variants:
+            if variant[0] in codings:
+                return variant
+        return None, self.path, self.size, self.etag
+
+
+class StaticFilesApplication:
+    """
+    WSGI wrapper that serves everything collected into STATIC_ROOT, picking
+    the precompressed variant the client accepts. Files whose names carry
+    the manifest hash are sent with a far-future, immutable Cache-Control.
+    Anything else falls through to the wrapped Django application.
+    """
+
+    manifest_name = 'staticfiles.json'
+
+    def __init__(self, application, root=None, prefix=None, max_age=None):
+        self.application = application
+        self.root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        self.max_age = max_age if max_age is not None else getattr(
+            settings, 'COURSEINFO_STATIC_MAX_AGE', 60)
+        self.files = self.scan()
+
+    def scan(self):
+        files = {}
+        if not self.root or not os.path.isdir(self.root):
+            return files
+        hashed_names = set(self.read_manifest().values())
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                files[self.prefix + name] = StaticFile(
+                    path, name in hashed_names)
+        return files
+
+    def read_manifest(self):
+        try:
+            with open(os.path.join(self.root, self.manifest_name)) as manifest:
+                return json.load(manifest).get('paths', {})
+        except (IOError, ValueError):
+            return {}
+
+    def __call__(self, environ, start_response):
+        static_file = self.files.get(environ.get('PATH_INFO', ''))
+        method = environ['REQUEST_METHOD']
+        if static_file is None or method not in ('GET', 'HEAD'):
+            return self.application(environ, start_response)
+        return self.serve(static_file, environ, start_response)
+
+    def serve(self, static_file, environ, start_response):
+        if static_file.immutable:
+            cache_control = 'public, max-age=315360000, immutable'
+        else:
+            cache_control = 'public, max-age=%d' % self.max_age
+        coding, path, size, etag = static_file.select(
+            environ.get('HTTP_ACCEPT_ENCODING', ''))
+        headers = [
+            ('Cache-Control', cache_control),
+            ('ETag', etag),
+            ('Last-Modified', static_file.last_modified),
+        ]
+        if static_file.variants:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if environ.get('HTTP_IF_NONE_MATCH') == etag:
+            start_response('304 Not Modified', headers)
+            return []
+
+        headers.append(('Content-Type', static_file.content_type))
+        headers.append(('Content-Length', str(size)))
+        if coding is not None:
+            headers.append(('Content-Encoding', coding))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        content = open(path, 'rb')
+        if file_wrapper is not None:
+            return file_wrapper(content)
+        return read_chunks(content)
+
+
+def read_chunks(content, chunk_size=8192):
+    with content:
+        for chunk in iter(lambda: content.read(chunk_size), b''):
+            yield chunk
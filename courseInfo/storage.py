@@ -0,0 +1,81 @@
+import gzip
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip variants are always written
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.xml')
+
+_css_comment = re.compile(r'/\*.*?\*/', re.DOTALL)
+_css_string = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_css_whitespace = re.compile(r'\s+')
+_css_punctuation = re.compile(r'\s*([{};,>])\s*')
+_css_colon = re.compile(r':\s+')
+
+
+def minify_css(content):
+    # quoted strings are left untouched, everything between them is squeezed
+    content = _css_comment.sub('', content)
+    parts = _css_string.split(content)
+    for i in range(0, len(parts), 2):
+        part = _css_whitespace.sub(' ', parts[i])
+        part = _css_colon.sub(':', _css_punctuation.sub(r'\1', part))
+        parts[i] = part.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+class BundledManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes the bundles listed in
+    COURSEINFO_STATIC_BUNDLES (concatenated and minified) and stores
+    .gz/.br variants next to every compressible file it collected.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bundles = getattr(settings, 'COURSEINFO_STATIC_BUNDLES', {})
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        paths = dict(paths)
+        for bundle_name, members in self.bundles.items():
+            self.build_bundle(bundle_name, members, paths)
+            paths[bundle_name] = (self, bundle_name)
+        yield from super().post_process(paths, dry_run, **options)
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def build_bundle(self, bundle_name, members, paths):
+        chunks = []
+        for member in members:
+            storage, path = paths[member]
+            with storage.open(path) as member_file:
+                chunks.append(member_file.read().decode(settings.FILE_CHARSET))
+        content = '\n'.join(minify_css(chunk) for chunk in chunks)
+        if self.exists(bundle_name):
+            self.delete(bundle_name)
+        self._save(bundle_name, ContentFile(content.encode()))
+
+    def compress(self, name):
+        with self.open(name) as original_file:
+            content = original_file.read()
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        for suffix, compressed in variants:
+            # a variant that doesn't beat the original is never served
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
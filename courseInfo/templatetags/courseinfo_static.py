@@ -0,0 +1,21 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def stylesheet_bundle(bundle_name):
+    # collectstatic only builds bundles for deployment; while DEBUG is on the
+    # member files are linked one by one so edits show up without a rebuild
+    bundles = getattr(settings, 'COURSEINFO_STATIC_BUNDLES', {})
+    if settings.DEBUG or bundle_name not in bundles:
+        names = bundles.get(bundle_name, [bundle_name])
+    else:
+        names = [bundle_name]
+    return format_html_join(
+        '\n',
+        '<link rel="stylesheet" type="text/css" href="{}">',
+        ((static(name),) for name in names))
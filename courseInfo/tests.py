@@ -1,3 +1,546 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import tempfile
+import zlib
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, Sum
+from django.http import StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from courseInfo import cache, refdata
+from courseInfo.credits import CreditLimitExceeded
+from courseInfo.forms import RegistrationForm
+from courseInfo.grades import GRADE_POINTS, save_grades
+from courseInfo.middleware import CompressionMiddleware, WaitingRoomMiddleware
+from courseInfo.models import (
+    Course, Instructor, Period, Prerequisite, Registration, RegistrationWindow, Section,
+    SectionGradeCount, Semester, Student, StudentGradeSummary, StudentSemesterLoad, Year)
+from courseInfo.prerequisites import requires, would_create_cycle
+from courseInfo.staticserve import StaticFilesApplication
+from courseInfo.timetickets import build_table, closed_reason, window_table
+
+
+def make_section(course_number='CS101', credit_hours=3, year=2030, period_sequence=1):
+    semester = Semester.objects.get_or_create(
+        year=Year.objects.get_or_create(year=year)[0],
+        period=Period.objects.get_or_create(
+            period_sequence=period_sequence,
+            defaults={'period_name': 'Period %d' % period_sequence})[0])[0]
+    course = Course.objects.create(course_number=course_number, course_name=course_number,
+                                   credit_hours=credit_hours)
+    instructor = Instructor.objects.get_or_create(first_name='Grace', last_name='Hopper')[0]
+    return Section.objects.create(semester=semester, course=course, instructor=instructor,
+                                  section_name='001', meeting_days='MWF',
+                                  start_time=datetime.time(9), end_time=datetime.time(10))
+
+
+class StaticServeTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        for name, content in (('site.css', b'body {}'), ('site.css.br', b'br'),
+                              ('site.css.gz', b'gz')):
+            with open(os.path.join(root.name, name), 'wb') as f:
+                f.write(content)
+        self.app = StaticFilesApplication(None, root=root.name, prefix='/static/')
+
+    def get(self, **environ):
+        environ.update(REQUEST_METHOD='GET', PATH_INFO='/static/site.css')
+        response = {}
+
+        def start_response(status, headers):
+            response.update(headers, status=status)
+        body = b''.join(self.app(environ, start_response))
+        return response, body
+
+    def test_refused_coding_is_not_served(self):
+        response, body = self.get(HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(body, b'gz')
+        response, body = self.get(HTTP_ACCEPT_ENCODING='br;q=0')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(body, b'body {}')
+
+    def test_each_coding_has_its_own_etag(self):
+        etags = {self.get(HTTP_ACCEPT_ENCODING=coding)[0]['ETag']
+                 for coding in ('br', 'gzip', 'identity')}
+        self.assertEqual(len(etags), 3)
+        plain = self.get()[0]['ETag']
+        self.assertEqual(self.get(HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=plain)[0]['status'],
+                         '200 OK')
+
+
+class ApiBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.student = Student.objects.create(first_name='Ada', last_name='Lovelace')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def batch(self, **spec):
+        spec.setdefault('key', 'students')
+        spec.setdefault('resource', 'student')
+        return self.client.post(reverse('courseInfo_api_batch_urlpattern'),
+                                json.dumps({'requests': [spec]}),
+                                content_type='application/json')
+
+    def test_filter(self):
+        response = self.batch(filter={'student_id': str(self.student.pk)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['student_id'] for row in response.json()['results']['students']],
+                         [self.student.pk])
+
+    def test_invalid_input_is_a_client_error(self):
+        for spec in [{'filter': {'student_id': 'abc'}},
+                     {'filter': {'student_id': {'a': 1}}},
+                     {'filter': {'student_id': [1, 'abc']}},
+                     {'ids': 5},
+                     {'ids': [1], 'fields': 'first_name'},
+                     {'ids': [1], 'fields': [1]},
+                     {'ids': [1], 'expand': 'section'}]:
+            with self.subTest(spec=spec):
+                response = self.batch(**spec)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_expansions_stay_in_their_request(self):
+        section = make_section()
+        response = self.client.post(reverse('courseInfo_api_batch_urlpattern'), json.dumps({'requests': [
+            {'key': 'semesters', 'resource': 'semester',
+             'filter': {'semester_id': section.semester_id}, 'expand': ['year']},
+            {'key': 'sections', 'resource': 'section', 'ids': [section.pk], 'expand': ['semester']},
+        ]}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(results['semesters'][0]['year']['year'], 2030)
+        self.assertNotIn('year', results['sections'][0]['semester'])
+
+
+# pages render without a collectstatic manifest
+PLAIN_STATIC = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+
+@override_settings(COURSEINFO_WAITING_ROOM_SLOTS=1, STATICFILES_STORAGE=PLAIN_STATIC)
+class WaitingRoomTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.section = make_section()
+        cls.student = Student.objects.create(first_name='Ada', last_name='Lovelace')
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.url = reverse('courseInfo_registration_create_urlpattern')
+        self.first, self.second = Client(), Client()
+        for client in (self.first, self.second):
+            client.force_login(self.user)
+
+    def test_successful_registration_frees_the_slot(self):
+        self.assertEqual(self.first.get(self.url).status_code, 200)
+        self.assertEqual(self.second.get(self.url).status_code, 503)
+        response = self.first.post(self.url, {'student': self.student.pk,
+                                              'section': self.section.pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.second.get(self.url).status_code, 200)
+
+    def test_needs_an_atomic_cache(self):
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': os.path.join(tempfile.gettempdir(), 'courseInfo-tests')}}):
+            with self.assertRaises(ImproperlyConfigured):
+                WaitingRoomMiddleware(lambda request: None)
+            with self.settings(COURSEINFO_WAITING_ROOM_SLOTS=0):
+                WaitingRoomMiddleware(lambda request: None)
+
+    def test_invalid_form_keeps_the_slot(self):
+        self.assertEqual(self.first.get(self.url).status_code, 200)
+        self.assertEqual(self.first.post(self.url, {}).status_code, 200)
+        self.assertEqual(self.second.get(self.url).status_code, 503)
+
+    def test_queued_post_is_sent_back_to_the_form(self):
+        self.assertEqual(self.first.get(self.url).status_code, 200)
+        form_url = 'http://testserver' + self.url
+        response = self.second.post(self.url, {'student': self.student.pk,
+                                               'section': self.section.pk},
+                                    HTTP_REFERER=form_url)
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(response.has_header('Retry-After'))
+        self.assertContains(response, 'url=%s' % form_url, status_code=503)
+        self.assertContains(response, 'not sent', status_code=503)
+        self.assertFalse(self.student.registrations.exists())
+
+
+class RegistrationWindowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = make_section().semester
+        cls.start = timezone.now().replace(microsecond=0)
+
+    def window(self, opens, closes, cohort='', last_name_from='', last_name_to=''):
+        RegistrationWindow.objects.create(
+            semester=self.semester, cohort=cohort,
+            last_name_from=last_name_from, last_name_to=last_name_to,
+            opens_at=self.start + datetime.timedelta(days=opens),
+            closes_at=self.start + datetime.timedelta(days=closes))
+
+    def reason(self, days, cohort='', last_name='Lovelace'):
+        return closed_reason(build_table(), self.semester.pk, cohort, last_name,
+                             now=self.start + datetime.timedelta(days=days, hours=12))
+
+    def test_two_rounds_for_the_same_group(self):
+        self.window(0, 1, cohort='senior')
+        self.window(3, 4, cohort='senior')
+        self.assertIsNone(self.reason(0, 'senior'))
+        self.assertIn('opens', self.reason(1, 'senior'))
+        self.assertIsNone(self.reason(3, 'senior'))
+        self.assertIn('closed', self.reason(4, 'senior'))
+
+    def test_cohort_window_then_everyone(self):
+        self.window(0, 1, cohort='senior')
+        self.window(2, 5)
+        self.assertIsNone(self.reason(0, 'senior'))
+        self.assertIn('opens', self.reason(0, 'junior'))
+        # the priority window has closed, the one for everybody is to come
+        self.assertIn('opens', self.reason(1, 'senior'))
+        self.assertIsNone(self.reason(2, 'senior'))
+        self.assertIsNone(self.reason(2, 'junior'))
+
+    def test_last_name_range_and_no_window(self):
+        self.window(0, 1, last_name_from='A', last_name_to='K')
+        self.assertIsNone(self.reason(0, last_name='Hopper'))
+        self.assertEqual(self.reason(0, last_name='Turing'),
+                         'There is no registration window for this student.')
+
+    def test_table_is_rebuilt_without_a_shared_cache(self):
+        cache.get_cache().clear()
+        self.window(0, 1)
+        self.assertIn(('', None), window_table()[self.semester.pk])
+        # update() sends no signal, like a save made in another worker
+        RegistrationWindow.objects.update(cohort='senior')
+        self.assertIn(('', None), window_table()[self.semester.pk])
+        with self.settings(COURSEINFO_LOCAL_CACHE_TIMEOUT=0):
+            cache.get_cache().clear()
+            self.assertIn(('senior', None), window_table()[self.semester.pk])
+            RegistrationWindow.objects.update(cohort='junior')
+            self.assertIn(('junior', None), window_table()[self.semester.pk])
+
+
+class PrerequisiteTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.first, self.second, self.third = [
+            Course.objects.create(course_number='CS%d' % n, course_name='CS%d' % n)
+            for n in (101, 201, 301)]
+
+    def test_closure_follows_edge_changes(self):
+        self.assertEqual(requires(self.third.pk), frozenset())
+        Prerequisite.objects.create(course=self.second, required_course=self.first)
+        edge = Prerequisite.objects.create(course=self.third, required_course=self.second)
+        self.assertEqual(requires(self.third.pk), {self.first.pk, self.second.pk})
+        self.assertTrue(would_create_cycle(self.first.pk, self.third.pk))
+        edge.required_course = self.first
+        edge.save()
+        self.assertEqual(requires(self.third.pk), {self.first.pk})
+        edge.delete()
+        self.assertEqual(requires(self.third.pk), frozenset())
+        self.assertFalse(would_create_cycle(self.first.pk, self.third.pk))
+
+    def test_closure_is_rebuilt_without_a_shared_cache(self):
+        edge = Prerequisite.objects.create(course=self.third, required_course=self.second)
+        self.assertEqual(requires(self.third.pk), {self.second.pk})
+        # update() sends no signal, like a save made in another worker
+        Prerequisite.objects.filter(pk=edge.pk).update(required_course=self.first)
+        self.assertEqual(requires(self.third.pk), {self.second.pk})
+        with self.settings(COURSEINFO_LOCAL_CACHE_TIMEOUT=0):
+            cache.get_cache().clear()
+            self.assertEqual(requires(self.third.pk), {self.first.pk})
+            Prerequisite.objects.filter(pk=edge.pk).update(required_course=self.second)
+            self.assertEqual(requires(self.third.pk), {self.second.pk})
+
+
+class CreditLoadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = make_section('CS101', credit_hours=3)
+        cls.other = make_section('CS201', credit_hours=4, period_sequence=2)
+        cls.students = [Student.objects.create(first_name='Student%d' % n, last_name='Test')
+                        for n in range(3)]
+        for student in cls.students:
+            Registration.objects.create(student=student, section=cls.section)
+        Registration.objects.create(student=cls.students[0], section=cls.other)
+
+    def assertLoadsRecount(self):
+        maintained = {(student_id, semester_id): hours for student_id, semester_id, hours in
+                      StudentSemesterLoad.objects.exclude(credit_hours=0).values_list(
+                          'student_id', 'semester_id', 'credit_hours')}
+        recount = {(row['student_id'], row['section__semester_id']): row['hours'] for row in
+                   Registration.objects.order_by().values('student_id', 'section__semester_id')
+                   .annotate(hours=Sum('section__course__credit_hours'))}
+        self.assertEqual(maintained, recount)
+
+    def test_section_moved_to_another_semester_and_course(self):
+        self.assertLoadsRecount()
+        self.section.semester = self.other.semester
+        self.section.course = self.other.course
+        self.section.section_name = '002'
+        self.section.save()
+        self.assertLoadsRecount()
+        self.assertEqual(StudentSemesterLoad.objects.get(
+            student=self.students[0], semester=self.other.semester).credit_hours, 8)
+
+    def test_course_credit_hours_changed(self):
+        self.other.course.credit_hours = 1
+        self.other.course.save()
+        self.assertLoadsRecount()
+
+    def test_unchanged_course_is_read_once(self):
+        course = Course.objects.get(pk=self.other.course_id)
+        # the UPDATE, and one read of the stored row for both credits and grades
+        with self.assertNumQueries(2):
+            course.save()
+
+    def test_loads_are_read_only_in_the_admin(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        load = StudentSemesterLoad.objects.first()
+        add_url = reverse('admin:courseInfo_studentsemesterload_add')
+        change_url = reverse('admin:courseInfo_studentsemesterload_change', args=[load.pk])
+        self.assertEqual(self.client.get(add_url).status_code, 403)
+        self.assertEqual(self.client.post(change_url, {'credit_hours': 99}).status_code, 403)
+        load.refresh_from_db()
+        self.assertNotEqual(load.credit_hours, 99)
+
+    @override_settings(COURSEINFO_MAX_CREDIT_HOURS=6)
+    def test_limit_is_held_when_saving(self):
+        # past the form's check, as a concurrent registration would be
+        third = make_section('CS301', credit_hours=4, period_sequence=2)
+        with self.assertRaises(CreditLimitExceeded):
+            Registration.objects.create(student=self.students[0], section=third)
+        self.assertFalse(third.registrations.exists())
+        self.assertLoadsRecount()
+
+
+class RolloverAdminTests(TestCase):
+    def actions_for(self, *codenames):
+        user = get_user_model().objects.create_user('staff-%s' % '-'.join(codenames), is_staff=True)
+        user.user_permissions.set(Permission.objects.filter(codename__in=codenames))
+        request = RequestFactory().get('/')
+        request.user = get_user_model().objects.get(pk=user.pk)
+        return admin.site._registry[Semester].get_actions(request)
+
+    def test_action_needs_add_section(self):
+        self.assertNotIn('roll_over_sections', self.actions_for('view_semester', 'change_semester'))
+        self.assertIn('roll_over_sections', self.actions_for('view_semester', 'add_section'))
+
+
+class GradeTotalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = make_section('CS101', credit_hours=3)
+        cls.other = make_section('CS201', credit_hours=4)
+        cls.students = [Student.objects.create(first_name='Student%d' % n, last_name='Test')
+                        for n in range(3)]
+        for student, grade in zip(cls.students, ['A', 'B', 'W']):
+            Registration.objects.create(student=student, section=cls.section, grade=grade)
+        Registration.objects.create(student=cls.students[0], section=cls.other, grade='C')
+
+    def assertTotalsRecount(self):
+        summaries = {student_id: (points, hours) for student_id, points, hours in
+                     StudentGradeSummary.objects.exclude(graded_hours=0).values_list(
+                         'student_id', 'quality_points', 'graded_hours')}
+        recount = {}
+        for student_id, grade, hours in Registration.objects.filter(
+                grade__in=list(GRADE_POINTS)).values_list(
+                'student_id', 'grade', 'section__course__credit_hours'):
+            points, graded_hours = recount.get(student_id, (0, 0))
+            recount[student_id] = (points + GRADE_POINTS[grade] * hours, graded_hours + hours)
+        self.assertEqual(summaries, recount)
+        counts = {(section_id, grade): registrations
+                  for section_id, grade, registrations in SectionGradeCount.objects.exclude(
+                      registrations=0).values_list('section_id', 'grade', 'registrations')}
+        recount = {(row['section_id'], row['grade']): row['registrations'] for row in
+                   Registration.objects.exclude(grade='').order_by()
+                   .values('section_id', 'grade').annotate(registrations=Count('pk'))}
+        self.assertEqual(counts, recount)
+
+    def test_grade_edits(self):
+        self.assertTotalsRecount()
+        registration = self.students[1].registrations.get()
+        registration.grade = 'F'
+        registration.save()
+        self.assertTotalsRecount()
+        registrations = list(self.section.registrations.all())
+        for registration in registrations:
+            registration._grade_before = registration.grade
+            registration.grade = 'A-'
+        save_grades(registrations)
+        self.assertTotalsRecount()
+
+    def test_grades_only_on_the_grade_sheet(self):
+        self.assertNotIn('grade', RegistrationForm().fields)
+
+    def test_totals_are_read_only_in_the_admin(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        for model in (StudentGradeSummary, SectionGradeCount):
+            name = model._meta.model_name
+            obj = model.objects.first()
+            with self.subTest(model=name):
+                self.assertEqual(self.client.get(
+                    reverse('admin:courseInfo_%s_add' % name)).status_code, 403)
+                self.assertEqual(self.client.post(
+                    reverse('admin:courseInfo_%s_change' % name, args=[obj.pk]), {}).status_code, 403)
+
+    def test_grade_sheet_skips_rows_not_in_the_section(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        registrations = list(self.section.registrations.order_by('pk'))
+        moved = registrations[2]
+        Registration.objects.filter(pk=moved.pk).update(section=self.other)
+        data = {'form-TOTAL_FORMS': 4, 'form-INITIAL_FORMS': 3,
+                'form-MIN_NUM_FORMS': 0, 'form-MAX_NUM_FORMS': 1000,
+                # a form the sheet never had
+                'form-3-grade': 'A'}
+        for i, registration in enumerate(registrations):
+            data['form-%d-registration_id' % i] = registration.pk
+            data['form-%d-grade' % i] = 'B-'
+        response = self.client.post(
+            reverse('courseInfo_section_grades_urlpattern', args=[self.section.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(sorted(self.section.registrations.values_list('grade', flat=True)),
+                         ['B-', 'B-'])
+        self.assertEqual(Registration.objects.get(pk=moved.pk).grade, moved.grade)
+        self.assertEqual(Registration.objects.count(), 4)
+
+    def test_section_edit(self):
+        self.section.course = self.other.course
+        self.section.section_name = '002'
+        self.section.save()
+        self.assertTotalsRecount()
+        # the same course again: the UPDATE, the stored row, and the credit
+        # hours credits compares, but nothing moved and nothing recounted
+        with self.assertNumQueries(3):
+            self.section.save()
+        self.assertTotalsRecount()
+
+
+@override_settings(STATICFILES_STORAGE=PLAIN_STATIC)
+class SectionRosterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = make_section()
+        cls.student = Student.objects.create(first_name='Ada', last_name='Lovelace')
+        Registration.objects.create(student=cls.student, section=cls.section)
+
+    def login(self, *codenames):
+        user = get_user_model().objects.create_user('staff')
+        user.user_permissions.set(Permission.objects.filter(codename__in=codenames))
+        self.client.force_login(user)
+
+    def test_roster_needs_registration_and_student_permissions(self):
+        self.login('view_section')
+        response = self.client.get(self.section.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Lovelace')
+        self.assertEqual(self.client.get(self.section.get_roster_url()).status_code, 403)
+
+    def test_roster_with_permissions(self):
+        self.login('view_section', 'view_registration', 'view_student')
+        response = self.client.get(self.section.get_absolute_url())
+        self.assertContains(response, 'Lovelace')
+        self.assertContains(response, 'href="%s"' % self.student.registrations.get().get_absolute_url())
+        response = self.client.get(self.section.get_roster_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Lovelace', b''.join(response.streaming_content))
+
+
+@override_settings(STATICFILES_STORAGE=PLAIN_STATIC)
+class FragmentListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'admin')
+        Instructor.objects.bulk_create(
+            [Instructor(first_name='First%02d' % n, last_name='Last%02d' % n) for n in range(20)])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('courseInfo_instructor_list_urlpattern')
+
+    def rows(self, query):
+        return self.client.get(self.url + query, HTTP_X_FRAGMENT='rows')
+
+    def test_rows_follow_on_without_an_empty_row(self):
+        first = self.rows('')
+        second = self.rows(first['X-Next-Page'])
+        self.assertEqual(second.status_code, 200)
+        self.assertFalse(second.has_header('X-Next-Page'))
+        self.assertContains(second, 'Last19')
+        self.assertNotContains(second, 'Last00')
+        # the page after the last row is empty, and says nothing
+        last = list(Instructor.objects.order_by('last_name', 'first_name', 'pk'))[-1]
+        cursor = signing.dumps(
+            [['last_name', 'first_name', 'pk'], [last.last_name, last.first_name, last.pk]],
+            salt='courseInfo.utils.FragmentListMixin')
+        empty = self.rows('?after=%s' % cursor)
+        self.assertEqual(empty.status_code, 200)
+        self.assertNotContains(empty, 'no instructors available')
+
+    def test_cursor_from_another_ordering_is_rejected(self):
+        cursor = self.rows('')['X-Next-Page']
+        self.assertEqual(self.rows(cursor + '&sort=-sections').status_code, 400)
+        for payload in ([1], [['pk'], [1]], 'x'):
+            with self.subTest(payload=payload):
+                cursor = signing.dumps(payload, salt='courseInfo.utils.FragmentListMixin')
+                self.assertEqual(self.rows('?after=%s' % cursor).status_code, 400)
+
+
+class CompressionTests(SimpleTestCase):
+    def streamed(self, content_type, lines):
+        def get_response(request):
+            return StreamingHttpResponse(iter(lines), content_type=content_type)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = CompressionMiddleware(get_response)(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        return iter(response.streaming_content), zlib.decompressobj(31)
+
+    def test_json_lines_are_flushed_one_by_one(self):
+        lines = [b'{"schedule": %d}\n' % n for n in range(3)]
+        chunks, decompressor = self.streamed('application/x-ndjson', lines)
+        for line in lines:
+            self.assertEqual(decompressor.decompress(next(chunks)), line)
+
+    def test_other_streams_are_flushed_by_size(self):
+        lines = [b'row %d\n' % n for n in range(3)]
+        chunks, decompressor = self.streamed('text/csv', lines)
+        self.assertEqual(b''.join(decompressor.decompress(chunk) for chunk in chunks),
+                         b''.join(lines))
+
+
+class ReferenceDataTests(TestCase):
+    def setUp(self):
+        refdata.clear()
+        self.addCleanup(refdata.clear)
+        self.semester = make_section().semester
+
+    def test_saves_clear_the_snapshot(self):
+        self.assertIn(self.semester.pk, refdata.get().semester_labels)
+        semester = Semester.objects.create(
+            year=Year.objects.create(year=2031), period=self.semester.period)
+        self.assertEqual(refdata.get().semester_labels[semester.pk], str(semester))
+
+    @override_settings(COURSEINFO_REFDATA_CHECK_INTERVAL=0)
+    def test_changes_made_elsewhere_show_after_the_interval(self):
+        refdata.get()
+        # as another worker would, with a cache this process doesn't share
+        Year.objects.filter(year=2030).update(year=2029)
+        self.assertEqual(refdata.get().semester_labels[self.semester.pk], '2029 - Period 1')
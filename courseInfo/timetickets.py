@@ -0,0 +1,87 @@
+"""
+Registration time tickets.
+
+All RegistrationWindow rows are flattened into one table, kept through
+courseInfo.cache until a window changes (with locmem, for at most
+COURSEINFO_LOCAL_CACHE_TIMEOUT seconds):
+
+    {semester_id: {(cohort, initial): [(opens_at, closes_at), ...]}}
+
+where initial is an upper case letter, or None for a window without a
+last name range, and each list is in opening order. A group may have
+several windows (a second round, or a priority window before the one for
+everybody), so a student's windows are gathered from the at most four
+keys that match them, whatever the number of windows in all.
+"""
+import string
+
+from django.utils import timezone
+
+from . import cache
+from .models import RegistrationWindow
+
+
+def _initials(window):
+    if not window.last_name_from and not window.last_name_to:
+        return [None]
+    first = (window.last_name_from or 'A').upper()
+    last = (window.last_name_to or 'Z').upper()
+    return [letter for letter in string.ascii_uppercase if first <= letter <= last]
+
+
+def build_table():
+    table = {}
+    for window in RegistrationWindow.objects.order_by('opens_at'):
+        entries = table.setdefault(window.semester_id, {})
+        for initial in _initials(window):
+            entries.setdefault((window.cohort, initial), []).append(
+                (window.opens_at, window.closes_at))
+    return table
+
+
+def window_table():
+    return cache.get_or_set([RegistrationWindow], ('registration_windows',), build_table)
+
+
+def find_window(table, semester_id, cohort, last_name, now=None):
+    """
+    Return the (opens_at, closes_at) that decides whether the student may
+    register now: a window open now, else the next to open, else the last
+    to close. None if the semester has no windows at all, or () if it has
+    windows but none for this student.
+    """
+    entries = table.get(semester_id)
+    if entries is None:
+        return None
+    now = now or timezone.now()
+    initial = last_name[:1].upper() or None
+    upcoming = closed = None
+    for key in ((cohort, initial), (cohort, None), ('', initial), ('', None)):
+        for window in entries.get(key, ()):
+            opens_at, closes_at = window
+            if closes_at is not None and now >= closes_at:
+                if closed is None or closes_at > closed[1]:
+                    closed = window
+            elif opens_at <= now:
+                return window
+            elif upcoming is None or opens_at < upcoming[0]:
+                upcoming = window
+    return upcoming or closed or ()
+
+
+def closed_reason(table, semester_id, cohort, last_name, now=None):
+    """Why the student cannot register for the semester now, or None."""
+    now = now or timezone.now()
+    window = find_window(table, semester_id, cohort, last_name, now)
+    if window is None:
+        return None
+    if not window:
+        return 'There is no registration window for this student.'
+    opens_at, closes_at = window
+    if now < opens_at:
+        return 'Registration for this student opens %s.' % timezone.localtime(opens_at).strftime(
+            '%Y-%m-%d %H:%M')
+    if closes_at is not None and now >= closes_at:
+        return 'Registration for this student closed %s.' % timezone.localtime(closes_at).strftime(
+            '%Y-%m-%d %H:%M')
+    return None
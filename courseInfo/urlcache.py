@@ -0,0 +1,81 @@
+"""
+URLs of model pages without a reverse() per object.
+
+A list page calls get_absolute_url(), get_update_url() and
+get_delete_url() for every row, and reverse() walks the URLconf each
+time. url_for() instead reverses a pattern once, with a sentinel pk,
+keeps the text either side of it and from then on only joins the two
+halves around the object's pk. Templates are kept per URLconf and
+script prefix, the two things besides the pattern that reverse()
+depends on.
+
+The system check below compares url_for() with reverse() for every
+pattern in courseInfo.urls that takes a pk.
+"""
+from django.core import checks
+from django.core.signals import setting_changed
+from django.urls import get_script_prefix, get_urlconf, reverse
+
+SENTINEL = 7129341871
+
+_templates = {}
+
+
+def _template(viewname):
+    url = reverse(viewname, kwargs={'pk': SENTINEL})
+    head, found, tail = url.partition(str(SENTINEL))
+    if not found or str(SENTINEL) in tail:
+        # the sentinel isn't where the pk goes alone; reverse() every time
+        return None
+    return head, tail
+
+
+def url_for(viewname, pk):
+    """reverse(viewname, kwargs={'pk': pk}), for an integer pk."""
+    key = (get_urlconf(), get_script_prefix(), viewname)
+    try:
+        template = _templates[key]
+    except KeyError:
+        template = _templates[key] = _template(viewname)
+    if template is None:
+        return reverse(viewname, kwargs={'pk': pk})
+    return '%s%d%s' % (template[0], pk, template[1])
+
+
+def clear(**kwargs):
+    _templates.clear()
+
+
+def _setting_changed(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        clear()
+
+
+setting_changed.connect(_setting_changed, dispatch_uid='courseInfo.urlcache.setting_changed')
+
+
+def pk_patterns(patterns):
+    """The names of the patterns, included ones too, whose only argument is pk."""
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from pk_patterns(pattern.url_patterns)
+        elif pattern.name and set(pattern.pattern.regex.groupindex) == {'pk'}:
+            yield pattern.name
+
+
+@checks.register(checks.Tags.urls)
+def check_url_templates(app_configs=None, **kwargs):
+    from courseInfo import urls
+
+    errors = []
+    for name in pk_patterns(urls.urlpatterns):
+        for pk in (1, 42, 2 ** 31 - 1):
+            expected = reverse(name, kwargs={'pk': pk})
+            if url_for(name, pk) != expected:
+                errors.append(checks.Error(
+                    'url_for(%r, %d) does not match reverse(): %r.' % (name, pk, expected),
+                    hint='Give the pattern a plain <int:pk> argument, or keep '
+                         'reverse() in the model for it.',
+                    id='courseInfo.E001'))
+                break
+    return errors
@@ -15,6 +15,7 @@ Including another URLconf
 """
 from django.urls import path
 
+from courseInfo.api import ApiBatch, ApiBulkRegistration, ApiResourceDetail, ApiResourceList, ApiSchedules
 from courseInfo.views import (
     # course_list_view,
     # semester_list_view,
@@ -27,6 +28,8 @@ from courseInfo.views import (
     RegistrationList,
     InstructorDetail,
     SectionDetail,
+    SectionGrades,
+    SectionRoster,
     SemesterDetail,
     CourseDetail,
     StudentDetail,
@@ -49,6 +52,10 @@ from courseInfo.views import (
     SemesterDelete,
     StudentDelete,
     RegistrationDelete,
+    RegistrationCartDetail,
+    RegistrationCartAdd,
+    RegistrationCartRemove,
+    RegistrationCartCommit,
     )
 
 urlpatterns = [
@@ -88,6 +95,16 @@ urlpatterns = [
          name='courseInfo_section_detail_urlpattern'
          ),
 
+    path('section/<int:pk>/roster.csv',
+         SectionRoster.as_view(),
+         name='courseInfo_section_roster_urlpattern'
+         ),
+
+    path('section/<int:pk>/grades/',
+         SectionGrades.as_view(),
+         name='courseInfo_section_grades_urlpattern'
+         ),
+
     path('section/<int:pk>/update/',
          SectionUpdate.as_view(),
          name='courseInfo_section_update_urlpattern'
@@ -215,4 +232,49 @@ urlpatterns = [
          RegistrationCreate.as_view(),
          name='courseInfo_registration_create_urlpattern'
          ),
+
+    path('registration/cart/',
+         RegistrationCartDetail.as_view(),
+         name='courseInfo_registration_cart_urlpattern'
+         ),
+
+    path('registration/cart/add/',
+         RegistrationCartAdd.as_view(),
+         name='courseInfo_registration_cart_add_urlpattern'
+         ),
+
+    path('registration/cart/remove/',
+         RegistrationCartRemove.as_view(),
+         name='courseInfo_registration_cart_remove_urlpattern'
+         ),
+
+    path('registration/cart/commit/',
+         RegistrationCartCommit.as_view(),
+         name='courseInfo_registration_cart_commit_urlpattern'
+         ),
+
+    path('api/v1/batch/',
+         ApiBatch.as_view(),
+         name='courseInfo_api_batch_urlpattern'
+         ),
+
+    path('api/v1/registration/bulk/',
+         ApiBulkRegistration.as_view(),
+         name='courseInfo_api_registration_bulk_urlpattern'
+         ),
+
+    path('api/v1/schedules/',
+         ApiSchedules.as_view(),
+         name='courseInfo_api_schedules_urlpattern'
+         ),
+
+    path('api/v1/<str:resource>/',
+         ApiResourceList.as_view(),
+         name='courseInfo_api_list_urlpattern'
+         ),
+
+    path('api/v1/<str:resource>/<int:pk>/',
+         ApiResourceDetail.as_view(),
+         name='courseInfo_api_detail_urlpattern'
+         ),
 ]
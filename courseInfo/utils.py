@@ -1,4 +1,15 @@
+import operator
+import uuid
+from functools import reduce
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import redirect, render
+from django.utils.cache import patch_vary_headers
+
+from courseInfo import cache
 
 
 # class ObjectCreateMixin:
@@ -27,9 +38,10 @@ class PageLinksMixin:
     page_kwarg = 'page'
 
     def _page_urls(self, page_number):
-        return "?{pkw}={n}".format(
-            pkw=self.page_kwarg,
-            n=page_number)
+        # keep whatever else the list was asked for, filters and sort order
+        query = self.request.GET.copy()
+        query[self.page_kwarg] = page_number
+        return "?{}".format(query.urlencode())
 
     def first_page(self, page):
         # don't show on first page
@@ -74,3 +86,166 @@ class PageLinksMixin:
                     self.last_page(page),
             })
         return context
+
+
+def keyset_after(ordering, values):
+    """
+    The Q for rows that come after values in ordering, a list of field
+    names as given to order_by(), each optionally prefixed with '-'.
+    """
+    fields = [name.lstrip('-') for name in ordering]
+    conditions = []
+    for i, name in enumerate(ordering):
+        lookup = '%s__%s' % (fields[i], 'lt' if name.startswith('-') else 'gt')
+        conditions.append(Q(**dict(zip(fields[:i], values[:i])), **{lookup: values[i]}))
+    return reduce(operator.or_, conditions)
+
+
+class FragmentListMixin:
+    """
+    Infinite scrolling for a paginated ListView.
+
+    A request that sends the X-Fragment: rows header gets only the rows
+    template (<model>_list_rows.html), with none of base.html around it,
+    and the URL of the rows after them in the X-Next-Page header. Those
+    pages are keyset pages: the cursor holds the sort values of the last
+    row sent and the next rows are filtered on them, so there is no
+    COUNT() and no OFFSET however far down the list is scrolled. The cursor
+    is signed together with the ordering it was taken in, so one from
+    another sort order gets a 400 rather than a wrong page. The full page
+    renders as before and passes the cursor for the rows after its last
+    one as next_rows_url; rows templates get it as cursor, which tells
+    them not to render their "none available" row in mid-list.
+    """
+    fragment_header = 'HTTP_X_FRAGMENT'
+    cursor_kwarg = 'after'
+    cursor_salt = 'courseInfo.utils.FragmentListMixin'
+
+    def is_fragment(self):
+        return self.request.META.get(self.fragment_header) == 'rows'
+
+    def get_cursor_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or self.model._meta.ordering)
+        if not {'pk', '-pk', self.model._meta.pk.name} & set(ordering):
+            # ties in the sort values would otherwise be skipped or repeated
+            ordering.append('pk')
+        return ordering
+
+    def get_rows_url(self, ordering, last):
+        query = self.request.GET.copy()
+        query.pop(getattr(self, 'page_kwarg', 'page'), None)
+        query[self.cursor_kwarg] = signing.dumps(
+            [ordering, [getattr(last, name.lstrip('-')) for name in ordering]],
+            salt=self.cursor_salt)
+        return '?%s' % query.urlencode()
+
+    def get_fragment_template_names(self):
+        opts = self.model._meta
+        return ['%s/%s_list_rows.html' % (opts.app_label, opts.model_name)]
+
+    def get_fragment_context_data(self, **kwargs):
+        return kwargs
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_fragment():
+            response = super().get(request, *args, **kwargs)
+            patch_vary_headers(response, ['X-Fragment'])
+            return response
+        queryset = self.get_queryset()
+        ordering = self.get_cursor_ordering(queryset)
+        queryset = queryset.order_by(*ordering)
+        cursor = request.GET.get(self.cursor_kwarg)
+        if cursor:
+            try:
+                cursor_ordering, values = signing.loads(cursor, salt=self.cursor_salt)
+            except (signing.BadSignature, TypeError, ValueError):
+                return HttpResponseBadRequest('Unknown cursor.')
+            if cursor_ordering != ordering or len(values) != len(ordering):
+                # taken in another sort order; its values mean nothing here
+                return HttpResponseBadRequest('The cursor does not match the sort order.')
+            queryset = queryset.filter(keyset_after(ordering, values))
+        # one row more than a page says whether there is anything after it
+        rows = list(queryset[:self.paginate_by + 1])
+        more = len(rows) > self.paginate_by
+        rows = rows[:self.paginate_by]
+        context = {self.get_context_object_name(queryset): rows, 'object_list': rows,
+                   'cursor': cursor}
+        response = render(request, self.get_fragment_template_names(),
+                          self.get_fragment_context_data(**context))
+        if more:
+            response['X-Next-Page'] = self.get_rows_url(ordering, rows[-1])
+        patch_vary_headers(response, ['X-Fragment'])
+        return response
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj')
+        if page is not None and page.has_next() and page.object_list:
+            context['next_rows_url'] = self.get_rows_url(
+                self.get_cursor_ordering(self.object_list), list(page.object_list)[-1])
+        return context
+
+
+class IdempotentCreateMixin:
+    """
+    Make a CreateView's POST safe to repeat.
+
+    The form carries a one-time key (or the client sends an Idempotency-Key
+    header). The first POST with a key claims it in the cache; once the
+    object is saved the key remembers the redirect, and any replay of the
+    same key is sent there without validating or writing anything. A replay
+    that arrives while the first POST is still running gets a 409.
+
+    The claim is a cache add(), so this is only as safe as that add() is
+    atomic: it is with locmem within one process and with redis across
+    workers, but the file backend reads before it writes, and two
+    concurrent POSTs in different workers can both claim the same key.
+    """
+    idempotency_field = 'idempotency_key'
+    idempotency_header = 'HTTP_IDEMPOTENCY_KEY'
+    pending = 'pending'
+
+    def get_idempotency_key(self):
+        return (self.request.POST.get(self.idempotency_field)
+                or self.request.META.get(self.idempotency_header))
+
+    def _idempotency_cache_key(self, key):
+        return '%s:idempotency:%s:%s:%s' % (
+            cache.KEY_PREFIX, self.request.user.pk,
+            self.model._meta.label_lower, key[:64])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # a re-rendered invalid form keeps its key, the claim was released
+        context['idempotency_key'] = self.get_idempotency_key() or uuid.uuid4().hex
+        return context
+
+    def post(self, request, *args, **kwargs):
+        key = self.get_idempotency_key()
+        if not key:
+            return super().post(request, *args, **kwargs)
+        store = cache.get_cache()
+        cache_key = self._idempotency_cache_key(key)
+        timeout = getattr(settings, 'COURSEINFO_IDEMPOTENCY_TIMEOUT', 60 * 60)
+        while not store.add(cache_key, self.pending, timeout):
+            location = store.get(cache_key)
+            if location == self.pending:
+                response = HttpResponse(
+                    'This form is already being submitted.', status=409)
+                response['Retry-After'] = '1'
+                return response
+            if location is not None:
+                return redirect(location)
+            # expired between add() and get(); try to claim it again, since
+            # another request may have claimed it in the meantime
+        try:
+            response = super().post(request, *args, **kwargs)
+        except Exception:
+            store.delete(cache_key)
+            raise
+        if response.status_code == 302:
+            store.set(cache_key, response['Location'], timeout)
+        else:
+            # the form had errors; let the corrected form reuse the key
+            store.delete(cache_key)
+        return response
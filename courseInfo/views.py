@@ -1,11 +1,22 @@
+import csv
+import io
+
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.core.paginator import Paginator
+from django.db.models import Count, F, Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views import View
 from django.views.generic import ListView, CreateView, DeleteView, UpdateView
 
-from courseInfo.forms import InstructorForm, SectionForm, CourseForm, SemesterForm, StudentForm, RegistrationForm
-from courseInfo.utils import PageLinksMixin
+from courseInfo.cart import RegistrationCart
+from courseInfo.credits import CreditLimitExceeded
+from courseInfo.forms import InstructorForm, SectionForm, CourseForm, SemesterForm, StudentForm, RegistrationForm, \
+    RegistrationCartForm, GradeFormSet, InstructorLoadForm
+from courseInfo.grades import distribution, save_grades
+from courseInfo.urlcache import url_for
+from courseInfo.utils import FragmentListMixin, IdempotentCreateMixin, PageLinksMixin
 from .models import (
     Instructor,
     Section,
@@ -13,14 +24,52 @@ from .models import (
     Semester,
     Student,
     Registration,
+    StudentGradeSummary,
 
 )
 
 
-class InstructorList(LoginRequiredMixin, PermissionRequiredMixin, PageLinksMixin, ListView):     # mixin super class
+class InstructorList(LoginRequiredMixin, PermissionRequiredMixin, FragmentListMixin, PageLinksMixin, ListView):     # mixin super class
     paginate_by = 15
     model = Instructor
     permission_required = 'courseInfo.view_instructor'
+    sort_fields = {'sections': 'section_count', 'registrations': 'registration_count'}
+
+    def get_queryset(self):
+        self.form = InstructorLoadForm(self.request.GET)
+        self.semester, self.sort = None, 'name'
+        if self.form.is_valid():
+            self.semester = self.form.cleaned_data['semester']
+            self.sort = self.form.cleaned_data['sort'] or 'name'
+        # teaching load for the whole page in one grouped query rather
+        # than a query per instructor
+        queryset = Instructor.objects.annotate(
+            section_count=Count('sections', distinct=True),
+            registration_count=Count('sections__registrations'),
+        )
+        prefix = ''
+        if self.semester is not None:
+            in_semester = Q(sections__semester=self.semester)
+            queryset = queryset.annotate(
+                semester_section_count=Count('sections', filter=in_semester, distinct=True),
+                semester_registration_count=Count('sections__registrations', filter=in_semester),
+            )
+            prefix = 'semester_'
+        ordering = []
+        if self.sort != 'name':
+            # sorting by load means the semester's load once one is chosen
+            descending, field = self.sort.startswith('-'), self.sort.lstrip('-')
+            ordering.append('%s%s%s' % ('-' if descending else '', prefix, self.sort_fields[field]))
+        return queryset.order_by(*ordering, 'last_name', 'first_name', 'pk')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({'load_form': self.form, 'semester': self.semester, 'sort': self.sort})
+        return context
+
+    def get_fragment_context_data(self, **kwargs):
+        kwargs['semester'] = self.semester
+        return super().get_fragment_context_data(**kwargs)
 
 
 class InstructorDetail(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -96,29 +145,118 @@ class SectionList(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     permission_required = 'courseInfo.view_section'
 
 
-class SectionDetail(LoginRequiredMixin, PermissionRequiredMixin, View):
+ROSTER_COLUMNS = ['student_id', 'last_name', 'first_name', 'nickname', 'grade']
+
+# a roster lists students and their registrations, so viewing the section
+# alone is not enough to see it
+ROSTER_PERMISSIONS = ('courseInfo.view_registration', 'courseInfo.view_student')
+
+
+def section_roster(section):
+    """A section's registrations as dicts, student names joined in the same query."""
+    return (section.registrations
+            .order_by('student__last_name', 'student__first_name', 'pk')
+            .values('registration_id', 'student_id', 'grade',
+                    last_name=F('student__last_name'),
+                    first_name=F('student__first_name'),
+                    nickname=F('student__nickname')))
+
+
+class SectionDetail(LoginRequiredMixin, PermissionRequiredMixin, PageLinksMixin, View):
     permission_required = 'courseInfo.view_section'
+    roster_paginate_by = 50
 
     def get(self, request, pk):
         section = get_object_or_404(
-            Section,
+            Section.objects.select_related(
+                'course', 'semester', 'instructor', 'room'),
             pk=pk
         )
-        course = section.course
-        semester = section.semester
-        instructor = section.instructor
-        registration_list = section.registrations.all()
-        # 'registrations' is the related name in class Registration
-        return render(
-            request,
-            'courseInfo/section_detail.html',
-            {'section': section,
-             # section
-             'course': course,
-             'semester': semester,
-             'instructor': instructor,
-             'registration_list': registration_list}
-        )
+        context = {'section': section,
+                   # section
+                   'course': section.course,
+                   'semester': section.semester,
+                   'instructor': section.instructor,
+                   'show_roster': request.user.has_perms(ROSTER_PERMISSIONS),
+                   'grade_distribution': distribution(section)}
+        if context['show_roster']:
+            # a page of the roster at a time; a lecture can have hundreds
+            paginator = Paginator(section_roster(section), self.roster_paginate_by)
+            page = paginator.get_page(request.GET.get(self.page_kwarg))
+            # the rows are dicts, not models with get_absolute_url(), so
+            # their links come from url_for() rather than a {% url %} each
+            roster = [
+                dict(row, registration_url=url_for(
+                    'courseInfo_registration_detail_urlpattern', row['registration_id']))
+                for row in page.object_list]
+            context.update(
+                roster=roster,
+                paginator=paginator,
+                page_obj=page,
+                is_paginated=page.has_other_pages(),
+                first_page_url=self.first_page(page),
+                previous_page_url=self.previous_page(page),
+                next_page_url=self.next_page(page),
+                last_page_url=self.last_page(page))
+        return render(request, 'courseInfo/section_detail.html', context)
+
+
+class SectionRoster(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = ('courseInfo.view_section',) + ROSTER_PERMISSIONS
+
+    def get(self, request, pk):
+        section = get_object_or_404(Section, pk=pk)
+        response = StreamingHttpResponse(self.lines(section), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="section-%d-roster.csv"' % section.pk
+        return response
+
+    def lines(self, section):
+        # rows go out as they are read, without building the file in memory
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ROSTER_COLUMNS)
+        for row in section_roster(section).iterator():
+            writer.writerow([row[column] for column in ROSTER_COLUMNS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+
+class SectionGrades(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = 'courseInfo.change_registration'
+    template_name = 'courseInfo/section_grades.html'
+
+    def get_formset(self, section, data=None):
+        return GradeFormSet(
+            data,
+            queryset=section.registrations.select_related('student').order_by(
+                'student__last_name', 'student__first_name', 'pk'))
+
+    def get(self, request, pk):
+        section = get_object_or_404(Section, pk=pk)
+        return render(request, self.template_name,
+                      {'section': section, 'formset': self.get_formset(section)})
+
+    def post(self, request, pk):
+        section = get_object_or_404(Section, pk=pk)
+        formset = self.get_formset(section, request.POST)
+        if not formset.is_valid():
+            return render(request, self.template_name,
+                          {'section': section, 'formset': formset})
+        changed = []
+        for form in formset.forms:
+            registration = form.instance
+            # forms added to the posted sheet, and rows since deleted or
+            # moved to another section, have no registration here to grade
+            if registration.pk is None or registration.section_id != section.pk:
+                continue
+            if form.has_changed():
+                registration._grade_before = form.initial.get('grade', '')
+                changed.append(registration)
+        # one bulk_update() for the whole sheet rather than a save() per row
+        save_grades(changed)
+        return redirect(section)
 
 
 class SectionUpdate(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
@@ -163,7 +301,7 @@ class SectionDelete(LoginRequiredMixin, PermissionRequiredMixin, View):
         return redirect('courseInfo_section_list_urlpattern')
 
 
-class SectionCreate(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class SectionCreate(LoginRequiredMixin, PermissionRequiredMixin, IdempotentCreateMixin, CreateView):
     form_class = SectionForm
     model = Section
     permission_required = 'courseInfo.add_section'
@@ -185,13 +323,15 @@ class CourseDetail(LoginRequiredMixin, PermissionRequiredMixin, View):
         name = course.course_name
         number = course.course_number
         section_list = course.sections.all()
+        prerequisite_list = Course.objects.filter(required_for__course=course)
         return render(
             request,
             'courseInfo/course_detail.html',
             {'course': course,
              'name': name,
              'number': number,
-             'section_list': section_list}
+             'section_list': section_list,
+             'prerequisite_list': prerequisite_list}
         )
 
 
@@ -313,7 +453,7 @@ class SemesterCreate(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     permission_required = 'courseInfo.add_semester'
 
 
-class StudentList(LoginRequiredMixin, PermissionRequiredMixin, PageLinksMixin, ListView):
+class StudentList(LoginRequiredMixin, PermissionRequiredMixin, FragmentListMixin, PageLinksMixin, ListView):
     paginate_by = 25
     model = Student
     permission_required = 'courseInfo.view_student'
@@ -329,12 +469,14 @@ class StudentDetail(LoginRequiredMixin, PermissionRequiredMixin, View):
         )
         nickname = student.nickname
         registration_list = student.registrations.all()
+        grade_summary = StudentGradeSummary.objects.filter(student=student).first()
         return render(
             request,
             'courseInfo/student_detail.html',
             {'student': student,
              'nickname': nickname,
-             'registration_list': registration_list}
+             'registration_list': registration_list,
+             'grade_summary': grade_summary}
         )
 
 
@@ -379,7 +521,7 @@ class StudentDelete(LoginRequiredMixin, PermissionRequiredMixin, View):
         return redirect('courseInfo_student_list_urlpattern')
 
 
-class StudentCreate(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class StudentCreate(LoginRequiredMixin, PermissionRequiredMixin, IdempotentCreateMixin, CreateView):
     form_class = StudentForm
     model = Student
     permission_required = 'courseInfo.add_student'
@@ -409,7 +551,21 @@ class RegistrationDetail(LoginRequiredMixin, PermissionRequiredMixin, View):
         )
 
 
-class RegistrationUpdate(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class CreditLimitMixin:
+    """
+    Turn a credit limit passed between the form's check and the save (by
+    a concurrent registration for the same student) into a form error.
+    """
+
+    def form_valid(self, form):
+        try:
+            return super().form_valid(form)
+        except CreditLimitExceeded as error:
+            form.add_error(None, str(error))
+            return self.form_invalid(form)
+
+
+class RegistrationUpdate(LoginRequiredMixin, PermissionRequiredMixin, CreditLimitMixin, UpdateView):
     form_class = RegistrationForm
     model = Registration
     template_name = 'courseInfo/registration_form_update.html'
@@ -422,7 +578,59 @@ class RegistrationDelete(LoginRequiredMixin, PermissionRequiredMixin, DeleteView
     permission_required = 'courseInfo.delete_registration'
 
 
-class RegistrationCreate(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class RegistrationCreate(LoginRequiredMixin, PermissionRequiredMixin, IdempotentCreateMixin,
+                         CreditLimitMixin, CreateView):
     form_class = RegistrationForm
     model = Registration
     permission_required = 'courseInfo.add_registration'
+
+
+class RegistrationCartDetail(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = 'courseInfo.add_registration'
+
+    def get(self, request, form=None, results=None):
+        cart = RegistrationCart(request.session)
+        return render(
+            request,
+            'courseInfo/registration_cart.html',
+            {'form': form or RegistrationCartForm(),
+             'items': cart.items(results),
+             'failed': results is not None}
+        )
+
+
+class RegistrationCartAdd(RegistrationCartDetail):
+    http_method_names = ['post']
+
+    def post(self, request):
+        form = RegistrationCartForm(request.POST)
+        if not form.is_valid():
+            return self.get(request, form=form)
+        RegistrationCart(request.session).add(
+            form.cleaned_data['student'].pk, form.cleaned_data['section'].pk)
+        return redirect('courseInfo_registration_cart_urlpattern')
+
+
+class RegistrationCartRemove(RegistrationCartDetail):
+    http_method_names = ['post']
+
+    def post(self, request):
+        try:
+            RegistrationCart(request.session).remove(
+                request.POST['student'], request.POST['section'])
+        except (KeyError, ValueError):
+            pass
+        return redirect('courseInfo_registration_cart_urlpattern')
+
+
+class RegistrationCartCommit(RegistrationCartDetail):
+    http_method_names = ['post']
+
+    def post(self, request):
+        cart = RegistrationCart(request.session)
+        if not len(cart):
+            return redirect('courseInfo_registration_cart_urlpattern')
+        ok, results = cart.commit()
+        if not ok:
+            return self.get(request, results=results)
+        return redirect('courseInfo_registration_list_urlpattern')